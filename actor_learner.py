@@ -0,0 +1,267 @@
+"""
+actor_learner.py
+
+Decoupled actor/learner DQN training. `num_workers` actor processes step
+their own PersonalFinanceEnv with a local copy of the Q-network and write
+transitions into per-worker shared-memory rings; the learner process drains
+the rings into its replay buffer and runs gradient updates continuously,
+keeping roughly `utd_ratio` updates per collected transition. Every
+`sync_interval` updates the learner publishes its weights to a shared
+QNetwork, which actors pick up before their next step. Publishing is a
+seqlock: the version counter is odd while the learner copies, and an actor
+copies the shared weights into a scratch dict and loads them only if the
+version was even and unchanged across the copy; otherwise it keeps its
+current weights.
+
+Run:
+    python actor_learner.py --workers 8 --episodes 400 --utd_ratio 0.5
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from dqn_agent import DQNAgent, QNetwork
+from env_personal_finance import FinanceConfig, PersonalFinanceEnv
+
+
+class SharedTransitionQueue:
+    # Single-producer/single-consumer ring of transitions in shared memory.
+    # head and tail only ever increase; slot = counter % capacity.
+
+    def __init__(self, capacity, state_dim, ctx):
+        self.capacity = capacity
+        self.state_dim = state_dim
+        self._raw = {
+            "states": ctx.RawArray("f", capacity * state_dim),
+            "actions": ctx.RawArray("q", capacity),
+            "rewards": ctx.RawArray("f", capacity),
+            "next_states": ctx.RawArray("f", capacity * state_dim),
+            "dones": ctx.RawArray("f", capacity),
+        }
+        self.head = ctx.Value("q", 0)
+        self.tail = ctx.Value("q", 0)
+        self._views()
+
+    def _views(self):
+        d = self.state_dim
+        self.states = np.frombuffer(self._raw["states"], dtype=np.float32).reshape(-1, d)
+        self.actions = np.frombuffer(self._raw["actions"], dtype=np.int64)
+        self.rewards = np.frombuffer(self._raw["rewards"], dtype=np.float32)
+        self.next_states = np.frombuffer(self._raw["next_states"], dtype=np.float32).reshape(-1, d)
+        self.dones = np.frombuffer(self._raw["dones"], dtype=np.float32)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in ("states", "actions", "rewards", "next_states", "dones"):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._views()
+
+    def put_many(self, states, actions, rewards, next_states, dones, stop_event=None):
+        n = len(states)
+        if n > self.capacity:
+            raise ValueError(f"Chunk of {n} transitions exceeds queue capacity {self.capacity}")
+        # wait for the learner to free enough slots
+        while self.head.value + n - self.tail.value > self.capacity:
+            if stop_event is not None and stop_event.is_set():
+                return False
+            time.sleep(0.0005)
+        idx = (self.head.value + np.arange(n)) % self.capacity
+        self.states[idx] = states
+        self.actions[idx] = actions
+        self.rewards[idx] = rewards
+        self.next_states[idx] = next_states
+        self.dones[idx] = dones
+        with self.head.get_lock():
+            self.head.value += n
+        return True
+
+    def get_all(self):
+        head, tail = self.head.value, self.tail.value
+        if head == tail:
+            return None
+        idx = np.arange(tail, head) % self.capacity
+        batch = (self.states[idx], self.actions[idx], self.rewards[idx],
+                 self.next_states[idx], self.dones[idx])
+        with self.tail.get_lock():
+            self.tail.value = head
+        return batch
+
+
+def _refresh_weights(q_net, shared_net, version, seen_version):
+    # returns the version now loaded into q_net
+    v = version.value
+    if v == seen_version or v % 2:
+        return seen_version
+    snapshot = {k: t.clone() for k, t in shared_net.state_dict().items()}
+    if version.value != v:
+        # a publish started during the copy: keep the old weights, retry next step
+        return seen_version
+    q_net.load_state_dict(snapshot)
+    return v
+
+
+def _actor(worker_id, cfg, shared_net, version, queue, episodes_out, stop_event,
+           hidden_dim, epsilon_start, epsilon_end, epsilon_decay, chunk):
+    torch.set_num_threads(1)
+    # don't block exit on episode results the learner no longer reads
+    episodes_out.cancel_join_thread()
+    rng = np.random.default_rng(cfg.seed)
+    env = PersonalFinanceEnv(cfg)
+    q_net = QNetwork(env.state_dim, env.action_dim, hidden_dim)
+    q_net.eval()
+    seen_version = -1
+    while seen_version < 0:
+        seen_version = _refresh_weights(q_net, shared_net, version, seen_version)
+
+    buf = ([], [], [], [], [])
+    steps = 0
+    while not stop_event.is_set():
+        state = env.reset(monthly_income=cfg.monthly_income)
+        done = False
+        total_reward = 0.0
+        while not done and not stop_event.is_set():
+            seen_version = _refresh_weights(q_net, shared_net, version, seen_version)
+
+            eps = epsilon_end + (epsilon_start - epsilon_end) * np.exp(-1.0 * steps / epsilon_decay)
+            steps += 1
+            if rng.random() < eps:
+                action = int(rng.integers(0, env.action_dim))
+            else:
+                with torch.no_grad():
+                    action = q_net(torch.from_numpy(state).unsqueeze(0)).argmax(1).item()
+
+            next_state, reward, done, _ = env.step(action)
+            for column, value in zip(buf, (state, action, reward, next_state, done)):
+                column.append(value)
+            state = next_state
+            total_reward += reward
+
+            if len(buf[0]) >= chunk or done:
+                if not queue.put_many(*(np.asarray(c) for c in buf), stop_event=stop_event):
+                    return
+                buf = ([], [], [], [], [])
+        if done:
+            episodes_out.put((worker_id, total_reward))
+
+
+def train_actor_learner(episodes=200, num_workers=4, batch_size=64, horizon=120,
+                        income=10000.0, periods_per_month=1, utd_ratio=1.0,
+                        sync_interval=50, target_update=1000, lr=1e-3, gamma=0.99,
+                        epsilon_decay=500, hidden_dim=64, seed=42, queue_capacity=1024,
+                        chunk=16, save_path="checkpoints/dqn.pth"):
+    # `episodes` counts finished episodes across all actors; `sync_interval`
+    # and `target_update` are in learner updates.
+    if not 0 < chunk <= queue_capacity:
+        raise ValueError(f"chunk must be between 1 and queue_capacity ({queue_capacity}), got {chunk}")
+    ctx = mp.get_context("spawn")
+    torch.manual_seed(seed)
+    np.random.seed(seed)
+
+    agent = DQNAgent(state_dim=3, action_dim=9, hidden_dim=hidden_dim, lr=lr, memory_seed=seed,
+                     gamma=gamma, epsilon_decay=epsilon_decay)
+    shared_net = QNetwork(3, 9, hidden_dim)
+    shared_net.load_state_dict(agent.q_net.state_dict())
+    shared_net.share_memory()
+    version = ctx.Value("q", 0)
+    stop_event = ctx.Event()
+    episodes_out = ctx.Queue()
+
+    queues, workers = [], []
+    for i in range(num_workers):
+        cfg = FinanceConfig(monthly_income=income, horizon_months=horizon,
+                            periods_per_month=periods_per_month, seed=seed + i)
+        q = SharedTransitionQueue(queue_capacity, 3, ctx)
+        p = ctx.Process(target=_actor, name=f"actor-{i}",
+                        args=(i, cfg, shared_net, version, q, episodes_out, stop_event,
+                              hidden_dim, agent.epsilon, agent.epsilon_end, epsilon_decay, chunk))
+        p.start()
+        queues.append(q)
+        workers.append(p)
+
+    all_rewards = []
+    received = 0
+    updates = 0
+    start = time.time()
+    try:
+        while True:
+            for q in queues:
+                batch = q.get_all()
+                if batch is not None:
+                    agent.memory.push_many(*batch)
+                    received += len(batch[0])
+
+            while not episodes_out.empty() and len(all_rewards) < episodes:
+                all_rewards.append(episodes_out.get()[1])
+                if len(all_rewards) % 20 == 0:
+                    avg = np.mean(all_rewards[-20:])
+                    print(f"Episode {len(all_rewards)}/{episodes}, Avg Reward (last 20): {avg:.2f}, "
+                          f"transitions {received}, updates {updates}, {time.time() - start:.1f}s")
+            if len(all_rewards) >= episodes:
+                # stop collecting, but still pay off the updates owed for
+                # transitions already received
+                stop_event.set()
+
+            due = int(received * utd_ratio) - updates
+            if due <= 0 or len(agent.memory) < batch_size:
+                if stop_event.is_set():
+                    break
+                if not any(p.is_alive() for p in workers):
+                    raise RuntimeError("All actor processes exited before training finished")
+                time.sleep(0.001)
+                continue
+            # bounded bursts so rings are drained and episodes counted often
+            for _ in range(min(due, 64)):
+                agent.update(batch_size)
+                updates += 1
+                if updates % target_update == 0:
+                    agent.update_target()
+                if updates % sync_interval == 0:
+                    with version.get_lock():
+                        version.value += 1  # odd: copy in progress
+                    with torch.no_grad():
+                        for dst, src in zip(shared_net.parameters(), agent.q_net.parameters()):
+                            dst.copy_(src)
+                    with version.get_lock():
+                        version.value += 1
+    finally:
+        stop_event.set()
+        for p in workers:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    agent.save(save_path)
+    print(f"✅ Training complete ({received} transitions, {updates} updates). Model saved to {save_path}")
+    return all_rewards
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Actor/learner DQN training")
+    parser.add_argument("--episodes", type=int, default=200, help="Total episodes across actors")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1), help="Actor processes")
+    parser.add_argument("--batch_size", type=int, default=64, help="Batch size for updates")
+    parser.add_argument("--horizon", type=int, default=120, help="Planning horizon in months")
+    parser.add_argument("--income", type=float, default=10000.0, help="Monthly income")
+    parser.add_argument("--periods_per_month", type=int, default=1, help="Number of periods per month")
+    parser.add_argument("--utd_ratio", type=float, default=1.0, help="Learner updates per collected transition")
+    parser.add_argument("--sync_interval", type=int, default=50, help="Updates between weight syncs to actors")
+    parser.add_argument("--target_update", type=int, default=1000, help="Updates between target network syncs")
+    parser.add_argument("--save_path", type=str, default="checkpoints/dqn.pth", help="Checkpoint path")
+    args = parser.parse_args()
+
+    rewards = train_actor_learner(episodes=args.episodes, num_workers=args.workers,
+                                  batch_size=args.batch_size, horizon=args.horizon,
+                                  income=args.income, periods_per_month=args.periods_per_month,
+                                  utd_ratio=args.utd_ratio, sync_interval=args.sync_interval,
+                                  target_update=args.target_update, save_path=args.save_path)
+    print("Final average reward over last 10 episodes:", np.mean(rewards[-10:]))
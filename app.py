@@ -19,46 +19,258 @@ JSON body:
 }
 
 Response:
-- JSON containing "schedule" (list of rows) and "csv_path" (if saved)
+- JSON containing "schedule" (list of rows), "plan_id", "csv_url",
+  "store_plan_id" (in the columnar plan store, PLAN_STORE_DIR, see
+  plan_store.py) and "cache" ("hit", "disk" or "miss")
+- POST /schedule?stream=ndjson or ?stream=csv streams the rows as they are
+  rolled out instead (no caching, not saved to the plan repository)
+
+Plans are stored in an SQLite repository (PLAN_DB, default outputs/plans.db,
+see plan_repository.py) and served by:
+    POST /api/plan/save
+    GET  /api/plan/list?user=...&limit=50&cursor=...
+    GET  /api/plan/{plan_id}
+    GET  /api/download/plan/{plan_id}     (CSV)
+
+Models are loaded once per checkpoint and kept warm in a PolicyServer, which
+micro-batches concurrent requests into shared forward passes. Tune with the
+SCHEDULE_MAX_BATCH (default 32) and SCHEDULE_MAX_WAIT_MS (default 5)
+environment variables. At most SCHEDULE_MAX_SERVERS (default 8) servers are
+kept; the least recently used one is stopped when another checkpoint is
+requested, and a checkpoint that does not exist is a 404. Loaded networks
+are cached process-wide (LRU, capped by MODEL_CACHE_MAX_MB, default 256) and
+reloaded when the checkpoint file changes; GET /models reports cache hits
+and misses.
+
+Training runs in a background job queue (jobs.py, JOB_WORKERS processes,
+default 1) so no request waits on train_dqn:
+    POST   /jobs                 {"kind": "train" | "goal_plan", "params": {...}}
+    GET    /jobs, GET /jobs/{job_id}, GET /jobs/{job_id}/result
+    DELETE /jobs/{job_id}        (cancel)
+A finished job's checkpoint can be passed as "checkpoint" to /schedule.
+
+Identical requests against the same checkpoint version are answered from a
+plan cache (PLAN_CACHE_ENTRIES, PLAN_CACHE_MAX_MB, PLAN_CACHE_TTL seconds,
+and PLAN_CACHE_DIR to add an on-disk tier); GET /cache reports its counters.
 """
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
-from typing import Optional
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from typing import Literal, Optional
+import asyncio
 import os
 import pandas as pd
 
-from backend.rl_wrapper import generate_schedule
+from jobs import JobQueue
+from model_registry import default_registry
+from plan_cache import PlanCache, plan_key
+from plan_repository import InvalidCursor, PlanRepository
+from plan_store import PlanStore
+from policy_server import PolicyServer
+from scheduler import SCHEDULE_COLUMNS, schedule_config, stream_schedule, to_frame
+from schemas import JobRequest, SavePlanRequest, ScheduleRequest
+
+DEFAULT_CHECKPOINT = "checkpoints/scheduler_dqn.pth"
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+MAX_BATCH = int(os.environ.get("SCHEDULE_MAX_BATCH", "32"))
+MAX_WAIT_MS = float(os.environ.get("SCHEDULE_MAX_WAIT_MS", "5"))
+MAX_SERVERS = int(os.environ.get("SCHEDULE_MAX_SERVERS", "8"))
+
+plan_cache = PlanCache(
+    max_entries=int(os.environ.get("PLAN_CACHE_ENTRIES", "256")),
+    max_bytes=int(float(os.environ.get("PLAN_CACHE_MAX_MB", "64")) * 2**20),
+    ttl=float(os.environ.get("PLAN_CACHE_TTL", "3600")),
+    disk_dir=os.environ.get("PLAN_CACHE_DIR") or None,
+)
+
+plans = PlanRepository(os.environ.get("PLAN_DB", "outputs/plans.db"))
+plan_store = PlanStore(os.environ.get("PLAN_STORE_DIR", "outputs/plan_store"))
+
+_jobs: Optional[JobQueue] = None
+_servers: "OrderedDict[str, PolicyServer]" = OrderedDict()
+_servers_lock = asyncio.Lock()
+
 
-app = FastAPI(title="Smart Budget Manager - Schedule Planner")
+async def get_server(checkpoint: str) -> PolicyServer:
+    evicted = []
+    async with _servers_lock:
+        server = _servers.get(checkpoint)
+        if server is not None:
+            _servers.move_to_end(checkpoint)
+            return server
+        try:
+            server = await run_in_threadpool(
+                PolicyServer, checkpoint, max_batch_size=MAX_BATCH, max_wait_ms=MAX_WAIT_MS
+            )
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail=f"Checkpoint not found: {checkpoint}")
+        await server.start()
+        _servers[checkpoint] = server
+        while len(_servers) > MAX_SERVERS:
+            evicted.append(_servers.popitem(last=False)[1])
+    # stopping drains the evicted server's queue, so it happens outside the lock
+    for old in evicted:
+        await old.stop()
+    return server
 
-class ScheduleRequest(BaseModel):
-    monthly_income: float = Field(..., gt=0)
-    avg_expense: float = Field(..., gt=0)
-    plan_months: int = Field(..., gt=0)
-    episodes: Optional[int] = Field(200, gt=0)
-    checkpoint: Optional[str] = Field(None, description="Optional checkpoint path to load/save model")
+
+def get_jobs() -> JobQueue:
+    global _jobs
+    if _jobs is None:
+        _jobs = JobQueue(max_workers=int(os.environ.get("JOB_WORKERS", "1")))
+    return _jobs
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _jobs
+    if os.path.exists(DEFAULT_CHECKPOINT):
+        await get_server(DEFAULT_CHECKPOINT)
+    yield
+    if _jobs is not None:
+        await run_in_threadpool(_jobs.shutdown)
+        _jobs = None
+    for server in _servers.values():
+        await server.stop()
+    _servers.clear()
+
+
+app = FastAPI(title="Smart Budget Manager - Schedule Planner", lifespan=lifespan)
 
 @app.post("/schedule")
-def create_schedule(req: ScheduleRequest):
+async def create_schedule(req: ScheduleRequest,
+                          stream: Optional[Literal["ndjson", "csv"]] = None):
+    checkpoint = req.checkpoint if req.checkpoint else DEFAULT_CHECKPOINT
+    cfg = schedule_config(req.monthly_income, req.avg_expense, req.plan_months)
+    if stream:
+        try:
+            server = await get_server(checkpoint)
+            policy = await run_in_threadpool(server.current_policy)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        return StreamingResponse(stream_schedule(policy, cfg, stream),
+                                 media_type=STREAM_MEDIA_TYPES[stream])
+
+    # episodes only matters for training, so it does not split the cache
+    key = plan_key({**req.model_dump(exclude={"episodes"}), "checkpoint": checkpoint}, checkpoint)
+    cached, status = await run_in_threadpool(plan_cache.get, key)
+    if cached is not None:
+        return {**cached, "cache": status}
+
     try:
-        checkpoint = req.checkpoint if req.checkpoint else "checkpoints/scheduler_dqn.pth"
-        df = generate_schedule(
-            monthly_income=req.monthly_income,
-            avg_monthly_expense=req.avg_expense,
-            plan_months=req.plan_months,
-            checkpoint_path=checkpoint,
-        )
+        server = await get_server(checkpoint)
+        schedule = await server.schedule(cfg)
+        df = to_frame(schedule)
+    except HTTPException:
+        raise
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Checkpoint not found: {checkpoint}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    # Save a CSV for the dashboard to pick up (optional)
-    os.makedirs("outputs", exist_ok=True)
-    csv_path = os.path.join("outputs", "schedule_plan.csv")
-    df.to_csv(csv_path, index=False)
+    # Every schedule gets its own plan_id in the repository instead of
+    # overwriting a shared CSV; the CSV is available from the download URL.
+    # It is also archived in the columnar plan store for bulk scans.
+    saved = await run_in_threadpool(
+        plans.save, df, meta={"monthly_income": req.monthly_income,
+                              "avg_monthly_expense": req.avg_expense,
+                              "plan_months": req.plan_months},
+    )
+    store_plan_id = await run_in_threadpool(plan_store.append, df)
 
     # Return JSON-friendly structure
-    return {
+    result = {
         "schedule": df.to_dict(orient="records"),
-        "csv_path": csv_path
+        "plan_id": saved["plan_id"],
+        "csv_url": f"/api/download/plan/{saved['plan_id']}",
+        "store_plan_id": store_plan_id,
     }
+    await run_in_threadpool(plan_cache.put, key, result)
+    return {**result, "cache": status}
+
+@app.post("/jobs")
+async def submit_job(req: JobRequest):
+    try:
+        job_id = await run_in_threadpool(get_jobs().submit, req.kind, req.params)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return await run_in_threadpool(get_jobs().status, job_id)
+
+
+@app.get("/jobs")
+async def list_jobs():
+    return {"jobs": await run_in_threadpool(get_jobs().list)}
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = await run_in_threadpool(get_jobs().status, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    job = await run_in_threadpool(get_jobs().status, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return await run_in_threadpool(get_jobs().result, job_id)
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    if not await run_in_threadpool(get_jobs().cancel, job_id):
+        raise HTTPException(status_code=404, detail="No active job with that id")
+    return {"job_id": job_id, "cancelling": True}
+
+
+@app.post("/api/plan/save")
+async def save_plan(req: SavePlanRequest):
+    df = pd.DataFrame(req.plan)
+    meta = {"monthly_income": req.monthly_income, "avg_monthly_expense": req.avg_monthly_expense,
+            "plan_months": req.plan_months}
+    return await run_in_threadpool(plans.save, df, title=req.title, notes=req.notes,
+                                   user=req.user, meta=meta)
+
+@app.get("/api/plan/list")
+async def list_plans(user: Optional[str] = None, limit: int = Query(50, gt=0, le=500),
+                     cursor: Optional[str] = None):
+    try:
+        items, next_cursor = await run_in_threadpool(plans.list, user, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"plans": items, "next_cursor": next_cursor}
+
+async def _load_plan(plan_id: str):
+    found = await run_in_threadpool(plans.get, plan_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail=f"Plan {plan_id} not found")
+    summary, columns = found
+    return summary, pd.DataFrame(columns, columns=SCHEDULE_COLUMNS)
+
+@app.get("/api/plan/{plan_id}")
+async def get_plan(plan_id: str):
+    summary, df = await _load_plan(plan_id)
+    return {**summary, "plan": df.to_dict(orient="records")}
+
+@app.get("/api/download/plan/{plan_id}")
+async def download_plan(plan_id: str):
+    _, df = await _load_plan(plan_id)
+    return Response(df.to_csv(index=False), media_type="text/csv",
+                    headers={"Content-Disposition": f'attachment; filename="plan_{plan_id}.csv"'})
+
+@app.get("/models")
+def model_cache_stats():
+    return default_registry.stats()
+
+@app.get("/cache")
+def plan_cache_stats():
+    return plan_cache.stats()
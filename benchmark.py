@@ -0,0 +1,311 @@
+"""
+benchmark.py
+
+Throughput benchmarks for the training and serving hot paths:
+PersonalFinanceEnv.step, VectorPersonalFinanceEnv.step, ReplayBuffer.sample,
+DQNAgent.select_action, DQNAgent.update and end-to-end train_dqn. The
+update_compiled and train_dqn_fast suites time the torch.compile learner
+(update_compiled also records speedup_vs_eager) and the train_freq /
+gradient_steps schedule.
+
+Each case reports a rate (higher is better) or latency percentiles (lower is
+better) plus the peak traced Python/NumPy allocation, measured in a separate
+short pass so tracing does not slow the timed one. Results are written as
+JSON; with --baseline they are compared case by case (keyed by suite, case
+and params, so the eager runs inside update_compiled never stand in for the
+update suite) and the run exits non-zero if any case is slower than the
+baseline by more than --tolerance.
+
+Run:
+    python benchmark.py --output outputs/benchmark.json
+    python benchmark.py --baseline benchmarks/baseline.json --update-baseline
+    python benchmark.py --baseline benchmarks/baseline.json --only update
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# metric -> True if higher is better
+METRICS = {
+    "steps_per_sec": True,
+    "samples_per_sec": True,
+    "updates_per_sec": True,
+    "episodes_per_sec": True,
+    "p50_us": False,
+    "p90_us": False,
+    "p99_us": False,
+}
+
+
+def _rate(fn, n, repeats=3):
+    # best of `repeats` timings of n calls, in calls per second
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(n)
+        best = min(best, time.perf_counter() - start)
+    return n / best
+
+
+def _peak_bytes(fn, n):
+    tracemalloc.start()
+    try:
+        fn(n)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_env_step(horizons, quick):
+    from env_personal_finance import FinanceConfig, PersonalFinanceEnv
+
+    results = []
+    for horizon in horizons:
+        env = PersonalFinanceEnv(FinanceConfig(horizon_months=horizon, periods_per_month=1))
+        actions = np.random.default_rng(0).integers(0, env.action_dim, size=horizon).tolist()
+
+        def run(n):
+            done_steps = 0
+            while done_steps < n:
+                env.reset()
+                for a in actions:
+                    env.step(a)
+                done_steps += horizon
+
+        n = horizon * (20 if quick else 200)
+        results.append({"case": "env_step", "params": {"horizon": horizon},
+                        "steps_per_sec": _rate(run, n), "peak_bytes": _peak_bytes(run, horizon)})
+    return results
+
+
+def bench_vector_env_step(batch_sizes, horizon, quick):
+    from env_personal_finance import FinanceConfig, VectorPersonalFinanceEnv
+
+    results = []
+    for batch in batch_sizes:
+        env = VectorPersonalFinanceEnv(FinanceConfig(horizon_months=horizon, periods_per_month=1),
+                                       num_envs=batch)
+        env.reset()
+        actions = np.random.default_rng(0).integers(0, env.action_dim, size=batch)
+
+        def run(n):
+            for _ in range(n):
+                env.step(actions)
+
+        n = max(horizon, (20_000 if quick else 200_000) // batch)
+        rate = _rate(run, n) * batch
+        results.append({"case": "vector_env_step", "params": {"num_envs": batch, "horizon": horizon},
+                        "steps_per_sec": rate, "peak_bytes": _peak_bytes(run, horizon)})
+    return results
+
+
+def bench_replay_sample(capacities, batch_sizes, quick):
+    from dqn_agent import ReplayBuffer
+
+    results = []
+    for capacity in capacities:
+        buf = ReplayBuffer(capacity, state_dim=3, seed=0)
+        rng = np.random.default_rng(0)
+        buf.push_many(rng.random((capacity, 3)), rng.integers(0, 9, capacity),
+                      rng.random(capacity), rng.random((capacity, 3)), np.zeros(capacity))
+        for batch in batch_sizes:
+            def run(n):
+                for _ in range(n):
+                    buf.sample(batch)
+
+            results.append({"case": "replay_sample", "params": {"capacity": capacity, "batch_size": batch},
+                            "samples_per_sec": _rate(run, 2_000 if quick else 20_000),
+                            "peak_bytes": _peak_bytes(run, 100)})
+    return results
+
+
+def bench_select_action(quick):
+    from dqn_agent import DQNAgent
+
+    # epsilon pinned at 0 so every call runs the network
+    agent = DQNAgent(3, 9, epsilon_start=0.0, epsilon_end=0.0)
+    state = np.random.default_rng(0).random(3).astype(np.float32)
+    n = 1_000 if quick else 10_000
+    for _ in range(100):
+        agent.select_action(state)
+    times = np.empty(n)
+    for i in range(n):
+        start = time.perf_counter()
+        agent.select_action(state)
+        times[i] = time.perf_counter() - start
+    p50, p90, p99 = np.percentile(times * 1e6, [50, 90, 99])
+
+    def run(k):
+        for _ in range(k):
+            agent.select_action(state)
+
+    return [{"case": "select_action", "params": {},
+             "p50_us": p50, "p90_us": p90, "p99_us": p99, "peak_bytes": _peak_bytes(run, 100)}]
+
+
+def bench_update(batch_sizes, quick, **agent_kwargs):
+    # agent_kwargs (compile, double_dqn, tau) become part of the case params
+    from dqn_agent import DQNAgent
+
+    results = []
+    for batch in batch_sizes:
+        agent = DQNAgent(3, 9, **agent_kwargs)
+        rng = np.random.default_rng(0)
+        agent.memory.push_many(rng.random((10_000, 3)), rng.integers(0, 9, 10_000),
+                               rng.random(10_000), rng.random((10_000, 3)), np.zeros(10_000))
+
+        def run(n):
+            for _ in range(n):
+                agent.update(batch)
+
+        run(3)  # warm-up; triggers compilation
+        results.append({"case": "update", "params": {"batch_size": batch, **agent_kwargs},
+                        "updates_per_sec": _rate(run, 100 if quick else 1_000),
+                        "peak_bytes": _peak_bytes(run, 20)})
+    return results
+
+
+def bench_update_compiled(batch_sizes, quick):
+    # compiled learner next to eager runs from the same process, with the
+    # speedup recorded on the compiled cases
+    results = bench_update(batch_sizes, quick)
+    eager = {r["params"]["batch_size"]: r for r in results}
+    for variant in ({"compile": True}, {"compile": True, "double_dqn": True, "tau": 0.005}):
+        for result in bench_update(batch_sizes, quick, **variant):
+            base = eager[result["params"]["batch_size"]]["updates_per_sec"]
+            result["speedup_vs_eager"] = result["updates_per_sec"] / base
+            results.append(result)
+    return results
+
+
+def bench_train(horizons, quick, **train_kwargs):
+    from train import train_dqn
+
+    results = []
+    episodes = 2 if quick else 10
+    for horizon in horizons:
+        def run(n):
+            with contextlib.redirect_stdout(io.StringIO()):
+                train_dqn(episodes=n, horizon=horizon, seed=0,
+                          save_path=os.path.join("outputs", "benchmark", "dqn.pth"),
+                          **train_kwargs)
+
+        if train_kwargs.get("compile"):
+            run(1)  # compile outside the timed run
+        rate = _rate(run, episodes, repeats=1)
+        results.append({"case": "train_dqn", "params": {"horizon": horizon, **train_kwargs},
+                        "episodes_per_sec": rate,
+                        "steps_per_sec": rate * horizon,
+                        "peak_bytes": _peak_bytes(run, 1)})
+    return results
+
+
+def run_benchmarks(quick=False, only=None):
+    suites = {
+        "env_step": lambda: bench_env_step([12, 120], quick),
+        "vector_env_step": lambda: bench_vector_env_step([1, 64, 1024, 8192], 120, quick),
+        "replay_sample": lambda: bench_replay_sample([10_000, 100_000], [32, 64, 256], quick),
+        "select_action": lambda: bench_select_action(quick),
+        "update": lambda: bench_update([32, 64, 256], quick),
+        "train_dqn": lambda: bench_train([12, 120], quick),
+        "update_compiled": lambda: bench_update_compiled([64, 256], quick),
+        "train_dqn_fast": lambda: bench_train([120], quick, train_freq=4, gradient_steps=2,
+                                              compile=True),
+    }
+    results = []
+    for name, suite in suites.items():
+        if only and name not in only:
+            continue
+        print(f"Running {name}...", file=sys.stderr)
+        results.extend({"suite": name, **r} for r in suite())
+    return results
+
+
+def case_key(result):
+    params = ",".join(f"{k}={v}" for k, v in sorted(result["params"].items()))
+    return f"{result.get('suite', result['case'])}/{result['case']}[{params}]"
+
+
+def environment():
+    info = {"python": platform.python_version(), "numpy": np.__version__,
+            "machine": platform.machine(), "processor": platform.processor(),
+            "cpu_count": os.cpu_count()}
+    try:
+        import torch
+        info["torch"] = torch.__version__
+        info["torch_threads"] = torch.get_num_threads()
+    except ImportError:
+        pass
+    return info
+
+
+def compare(results, baseline, tolerance):
+    # -> list of (key, metric, baseline value, current value, relative change)
+    previous = {case_key(r): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get(case_key(result))
+        if old is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            if metric not in result or metric not in old or not old[metric]:
+                continue
+            change = (result[metric] - old[metric]) / old[metric]
+            if (change < -tolerance) if higher_is_better else (change > tolerance):
+                regressions.append((case_key(result), metric, old[metric], result[metric], change))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark training and inference hot paths")
+    parser.add_argument("--output", type=str, default="outputs/benchmark.json", help="Where to write results JSON")
+    parser.add_argument("--baseline", type=str, default=None, help="Baseline JSON to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Write these results to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown before flagging")
+    parser.add_argument("--only", nargs="*", default=None, help="Subset of suites to run")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations, for smoke runs")
+    args = parser.parse_args()
+
+    results = run_benchmarks(quick=args.quick, only=args.only)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment(),
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "results": results,
+    }
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for r in results:
+        metrics = "  ".join(f"{m}={r[m]:.1f}" for m in METRICS if m in r)
+        if "speedup_vs_eager" in r:
+            metrics += f"  speedup={r['speedup_vs_eager']:.2f}x"
+        print(f"{case_key(r):<60} {metrics}  peak={r['peak_bytes'] / 1024:.0f}KiB")
+    print(f"Results written to {args.output}")
+
+    if args.baseline and args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for key, metric, old, new, change in regressions:
+            print(f"REGRESSION {key} {metric}: {old:.1f} -> {new:.1f} ({change:+.1%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
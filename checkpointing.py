@@ -0,0 +1,132 @@
+"""
+checkpointing.py
+
+Full-state training checkpoints for train_dqn: online and target networks,
+optimizer state, the epsilon schedule (steps_done), the replay buffer and
+every RNG involved (python, numpy, torch, the env's generator, the replay
+sampler and a sample_config sampler), plus the episode counter and reward
+history. Resuming from one continues the run exactly as if it had not been
+interrupted.
+
+Layout under a checkpoint directory:
+
+    LATEST                 name of the newest complete checkpoint
+    ep000120/state.pt      torch.save of everything except the replay arrays
+    ep000120/replay/*.npy  replay buffer arrays (np.save, loaded memory-mapped)
+
+Each checkpoint is written to a temporary directory, renamed into place and
+only then published through LATEST (os.replace), so an interrupted write
+never replaces the previous checkpoint. The snapshot is taken on the
+training thread; serialization runs on a background thread.
+"""
+
+import os
+import random
+import shutil
+import threading
+
+import numpy as np
+import torch
+
+
+def capture_rng_state(env=None, sampler=None) -> dict:
+    state = {
+        "python": random.getstate(),
+        "numpy": np.random.get_state(),
+        "torch": torch.get_rng_state(),
+    }
+    if env is not None:
+        state["env"] = env.rng.bit_generator.state
+    if sampler is not None and hasattr(sampler, "rng"):
+        state["sampler"] = sampler.rng.bit_generator.state
+    return state
+
+
+def restore_rng_state(state: dict, env=None, sampler=None) -> None:
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    torch.set_rng_state(state["torch"])
+    if env is not None and "env" in state:
+        env.rng.bit_generator.state = state["env"]
+    if sampler is not None and "sampler" in state:
+        sampler.rng.bit_generator.state = state["sampler"]
+
+
+def latest_checkpoint(root: str):
+    # Path of the newest complete checkpoint under root, or None
+    try:
+        with open(os.path.join(root, "LATEST"), "r") as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    path = os.path.join(root, name)
+    return path if os.path.isdir(path) else None
+
+
+def _write(path: str, state: dict) -> None:
+    arrays = state["agent"]["memory"]["arrays"]
+    tmp = path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(os.path.join(tmp, "replay"))
+    for name, values in arrays.items():
+        np.save(os.path.join(tmp, "replay", f"{name}.npy"), values)
+    memory = {**state["agent"]["memory"], "arrays": sorted(arrays)}
+    torch.save({**state, "agent": {**state["agent"], "memory": memory}},
+               os.path.join(tmp, "state.pt"))
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(tmp, path)
+
+
+def load_checkpoint(path: str) -> dict:
+    # path is a checkpoint directory or a root holding LATEST
+    resolved = latest_checkpoint(path) or path
+    state = torch.load(os.path.join(resolved, "state.pt"), weights_only=False)
+    memory = state["agent"]["memory"]
+    memory["arrays"] = {
+        name: np.load(os.path.join(resolved, "replay", f"{name}.npy"), mmap_mode="r")
+        for name in memory["arrays"]
+    }
+    return state
+
+
+class CheckpointWriter:
+    def __init__(self, root: str, keep: int = 2):
+        self.root = root
+        self.keep = keep
+        self._thread = None
+        self.error = None
+        os.makedirs(root, exist_ok=True)
+
+    def save(self, episode: int, state: dict) -> None:
+        # at most one write in flight; a new save waits for the previous one
+        self.wait()
+        name = f"ep{episode:06d}"
+        self._thread = threading.Thread(target=self._run, args=(name, state),
+                                        name=f"checkpoint-{name}", daemon=True)
+        self._thread.start()
+
+    def _run(self, name: str, state: dict) -> None:
+        try:
+            _write(os.path.join(self.root, name), state)
+            tmp = os.path.join(self.root, "LATEST.tmp")
+            with open(tmp, "w") as f:
+                f.write(name)
+            os.replace(tmp, os.path.join(self.root, "LATEST"))
+            self._prune(name)
+        except Exception as e:
+            self.error = e
+
+    def _prune(self, newest: str) -> None:
+        names = sorted(n for n in os.listdir(self.root)
+                       if n.startswith("ep") and not n.endswith(".tmp"))
+        for name in names[: max(0, len(names) - self.keep)]:
+            if name != newest:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+    def wait(self) -> None:
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
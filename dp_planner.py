@@ -0,0 +1,173 @@
+"""
+dp_planner.py
+
+Dynamic-programming planner: backward induction over a discretized
+(expense ratio, wealth ratio) grid for one FinanceConfig, using the env's
+closed-form reward and allocation table. Solving takes milliseconds and is
+deterministic, so it can replace DQN training for a single user and serves as
+an optimality oracle for DQN checkpoints.
+
+The income ratio in the state is constant within an episode (1 /
+periods_per_month) and is not gridded. Expense needs are i.i.d. uniform per
+period and wealth grows deterministically with the allocation, so stage t
+uses the expected value of stage t + 1 over the next expense draw with the
+wealth ratio linearly interpolated.
+
+The state has no time index. When every stage picks the same actions (the
+case for the current reward, which does not depend on wealth or time) the
+table is stored as a single stage and DPPolicy is an ordinary stateless
+policy. A non-stationary table needs the stage as an input: call
+policy(states, stage), or take policy.rollout_policy() for one synchronized
+rollout (call i uses stage i). scheduler.load_policy refuses to serve
+non-stationary tables, since shared servers cannot supply the stage.
+
+Run:
+    python dp_planner.py --income 40000 --expense 12000 --months 24 --compare checkpoints/scheduler_dqn.pth
+"""
+
+import argparse
+import itertools
+import time
+
+import numpy as np
+
+from env_personal_finance import FinanceConfig, VectorPersonalFinanceEnv
+from scheduler import rollout_schedules, schedule_config
+
+
+def env_actions(cfg: FinanceConfig) -> np.ndarray:
+    # the allocations a policy can pick, i.e. the first action_dim rows
+    env = VectorPersonalFinanceEnv([cfg])
+    return env.actions[: env.action_dim]
+
+
+def stage_rewards(cfg: FinanceConfig, expense: np.ndarray, actions: np.ndarray) -> np.ndarray:
+    # (len(expense), len(actions)) rewards of PersonalFinanceEnv.step
+    income = cfg.monthly_income / cfg.periods_per_month
+    spend = income * actions[:, 0]
+    saved = income * (actions[:, 1] + actions[:, 2])
+    gap = spend[None, :] - expense[:, None]
+    balance = (np.abs(actions[:, 0] - 0.5) + np.abs(actions[:, 1] - 0.25)
+               + np.abs(actions[:, 2] - 0.25))
+    return (saved * 0.002 - np.maximum(gap, 0.0) * 0.0025
+            + np.maximum(-gap, 0.0) * 0.0005 - 0.05 * balance)
+
+
+class DPPolicy:
+    def __init__(self, table: np.ndarray, expense_bounds, wealth_max: float,
+                 values: np.ndarray = None):
+        # table: (stages, expense_bins, wealth_bins) action indices
+        self.table = np.asarray(table, dtype=np.uint8)
+        self.expense_bounds = tuple(float(b) for b in expense_bounds)
+        self.wealth_max = float(wealth_max)
+        self.values = values
+
+    @property
+    def stationary(self) -> bool:
+        return len(self.table) == 1
+
+    def __call__(self, states, stage: int = None) -> np.ndarray:
+        if stage is None:
+            if not self.stationary:
+                raise ValueError("A non-stationary DP policy needs the stage index")
+            stage = 0
+        states = np.asarray(states)
+        _, n_expense, n_wealth = self.table.shape
+        lo, hi = self.expense_bounds
+        e = ((states[:, 1] - lo) / (hi - lo) * n_expense).astype(np.int64)
+        w = np.rint(states[:, 2] / self.wealth_max * (n_wealth - 1)).astype(np.int64)
+        stage = min(stage, len(self.table) - 1)
+        return self.table[stage, np.clip(e, 0, n_expense - 1), np.clip(w, 0, n_wealth - 1)].astype(np.int64)
+
+    def rollout_policy(self):
+        # a fresh callable per synchronized rollout, one call per period
+        if self.stationary:
+            return self
+        stages = itertools.count()
+        return lambda states: self(states, next(stages))
+
+    def save(self, path: str) -> None:
+        np.savez(path, policy_table=self.table, expense_bounds=np.array(self.expense_bounds),
+                 wealth_max=np.array(self.wealth_max),
+                 values=self.values if self.values is not None else np.zeros(0))
+
+    @classmethod
+    def load(cls, path: str) -> "DPPolicy":
+        with np.load(path) as data:
+            values = data["values"] if data["values"].size else None
+            return cls(data["policy_table"], data["expense_bounds"], float(data["wealth_max"]), values)
+
+
+def solve_dp(cfg: FinanceConfig, expense_bins: int = 64, wealth_bins: int = 64,
+             gamma: float = 1.0, actions: np.ndarray = None) -> DPPolicy:
+    actions = env_actions(cfg) if actions is None else np.asarray(actions, dtype=np.float64)
+    stages = cfg.horizon_months * cfg.periods_per_month
+
+    # expense bins are equal-probability slices of the uniform draw; the
+    # state normalizes the need by expense_max
+    edges = np.linspace(cfg.expense_min, cfg.expense_max, expense_bins + 1)
+    rewards = stage_rewards(cfg, 0.5 * (edges[:-1] + edges[1:]), actions)
+
+    # wealth ratio grid; wealth never exceeds income * horizon
+    wealth_max = 1.0
+    grid = np.linspace(0.0, wealth_max, wealth_bins)
+    step = (cfg.monthly_income / cfg.periods_per_month) * (actions[:, 1] + actions[:, 2]) \
+        / (cfg.monthly_income * cfg.horizon_months)
+    pos = np.clip((grid[:, None] + step[None, :]) / wealth_max * (wealth_bins - 1), 0, wealth_bins - 1)
+    i0 = np.minimum(pos.astype(np.int64), wealth_bins - 2)
+    frac = pos - i0
+
+    table = np.zeros((stages, expense_bins, wealth_bins), dtype=np.uint8)
+    next_value = np.zeros(wealth_bins)  # E over the next expense draw
+    for t in range(stages - 1, -1, -1):
+        cont = next_value[i0] * (1.0 - frac) + next_value[i0 + 1] * frac  # (W, A)
+        q = rewards[:, None, :] + gamma * cont[None, :, :]                   # (E, W, A)
+        table[t] = q.argmax(axis=2)
+        value = q.max(axis=2)
+        next_value = value.mean(axis=0)
+
+    if (table == table[0]).all():
+        table = table[:1]
+    return DPPolicy(table, (cfg.expense_min / cfg.expense_max, 1.0), wealth_max, value)
+
+
+def dp_schedule(monthly_income: float, avg_monthly_expense: float, plan_months: int,
+                periods_per_month: int = 2, seed: int = 42, **solver_kwargs) -> dict:
+    # Same columns as scheduler.generate_schedule, without a checkpoint
+    cfg = schedule_config(monthly_income, avg_monthly_expense, plan_months, periods_per_month, seed)
+    policy = solve_dp(cfg, **solver_kwargs)
+    return rollout_schedules(policy.rollout_policy(), [cfg])[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve the allocation problem by dynamic programming")
+    parser.add_argument("--income", type=float, default=40000.0, help="Monthly income")
+    parser.add_argument("--expense", type=float, default=12000.0, help="Average monthly expense")
+    parser.add_argument("--months", type=int, default=12, help="Planning horizon in months")
+    parser.add_argument("--periods_per_month", type=int, default=2, help="Number of periods per month")
+    parser.add_argument("--expense_bins", type=int, default=64)
+    parser.add_argument("--wealth_bins", type=int, default=64)
+    parser.add_argument("--save", type=str, default=None, help="Write the policy table to this .npz")
+    parser.add_argument("--compare", type=str, default=None, help="DQN checkpoint to evaluate against the DP policy")
+    parser.add_argument("--episodes", type=int, default=10000, help="Evaluation episodes")
+    args = parser.parse_args()
+
+    cfg = schedule_config(args.income, args.expense, args.months, args.periods_per_month)
+    start = time.perf_counter()
+    policy = solve_dp(cfg, args.expense_bins, args.wealth_bins)
+    elapsed = time.perf_counter() - start
+    print(f"Solved {args.months * args.periods_per_month} stages in {elapsed * 1000:.1f} ms "
+          f"(expected reward {policy.values.mean(axis=0)[0]:.2f}, stationary={policy.stationary})")
+    if args.save:
+        policy.save(args.save)
+        print(f"Policy table written to {args.save}")
+
+    from evaluate import evaluate_policy
+
+    # one batch, so a non-stationary table sees every episode in step
+    print("DP ", evaluate_policy(policy.rollout_policy(), cfg, args.episodes,
+                                 batch_size=args.episodes).summary())
+    if args.compare:
+        from scheduler import load_policy
+
+        print("DQN", evaluate_policy(load_policy(args.compare), cfg, args.episodes).summary())
@@ -1,6 +1,6 @@
+import copy
 import random
 import numpy as np
-from collections import deque
 import torch
 import torch.nn as nn
 import torch.optim as optim
@@ -18,27 +18,226 @@ class QNetwork(nn.Module):
         x = torch.relu(self.fc2(x))
         return self.fc3(x)
 
-# Replay buffer for experience replay
+def load_q_network(filepath, state_dim=3, action_dim=9, hidden_dim=64, device="cpu"):
+    # Inference-only network, e.g. for schedule generation
+    q_net = QNetwork(state_dim, action_dim, hidden_dim).to(device)
+    q_net.load_state_dict(torch.load(filepath, map_location=device))
+    q_net.eval()
+    return q_net
+
+# Replay buffer for experience replay: fixed-capacity ring over preallocated
+# arrays. sample() writes into reused batch arrays, so the result is only
+# valid until the next call.
 class ReplayBuffer:
-    def __init__(self, capacity=10000):
-        self.buffer = deque(maxlen=capacity)
+    def __init__(self, capacity=10000, state_dim=None, seed=None):
+        self.capacity = capacity
+        self.pos = 0
+        self.size = 0
+        # seed=None draws fresh entropy without touching the global numpy stream
+        self.rng = np.random.default_rng(seed)
+        self._batch_size = None
+        if state_dim is not None:
+            self._allocate(state_dim)
+
+    def _allocate(self, state_dim):
+        self.state_dim = state_dim
+        self.states = np.zeros((self.capacity, state_dim), dtype=np.float32)
+        self.actions = np.zeros(self.capacity, dtype=np.int64)
+        self.rewards = np.zeros(self.capacity, dtype=np.float32)
+        self.next_states = np.zeros((self.capacity, state_dim), dtype=np.float32)
+        self.dones = np.zeros(self.capacity, dtype=np.float32)
 
     def push(self, state, action, reward, next_state, done):
-        self.buffer.append((state, action, reward, next_state, done))
+        if not hasattr(self, "states"):
+            self._allocate(len(state))
+        i = self.pos
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self.pos = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
 
-    def sample(self, batch_size):
-        batch = random.sample(self.buffer, batch_size)
-        state, action, reward, next_state, done = map(np.array, zip(*batch))
+    def push_many(self, states, actions, rewards, next_states, dones):
+        states = np.asarray(states, dtype=np.float32)
+        n = len(states)
+        if n == 0:
+            return
+        if not hasattr(self, "states"):
+            self._allocate(states.shape[1])
+        if n > self.capacity:
+            # only the newest `capacity` transitions would survive anyway
+            keep = slice(n - self.capacity, n)
+            states, actions, rewards = states[keep], np.asarray(actions)[keep], np.asarray(rewards)[keep]
+            next_states, dones = np.asarray(next_states)[keep], np.asarray(dones)[keep]
+            n = self.capacity
+        idx = (self.pos + np.arange(n)) % self.capacity
+        self.states[idx] = states
+        self.actions[idx] = actions
+        self.rewards[idx] = rewards
+        self.next_states[idx] = next_states
+        self.dones[idx] = dones
+        self.pos = int((self.pos + n) % self.capacity)
+        self.size = min(self.size + n, self.capacity)
+
+    def _sample_into(self, idx):
+        batch_size = len(idx)
+        if self._batch_size != batch_size:
+            self._batch_size = batch_size
+            self._batch = (
+                np.empty((batch_size, self.state_dim), dtype=np.float32),
+                np.empty(batch_size, dtype=np.int64),
+                np.empty(batch_size, dtype=np.float32),
+                np.empty((batch_size, self.state_dim), dtype=np.float32),
+                np.empty(batch_size, dtype=np.float32),
+            )
+        state, action, reward, next_state, done = self._batch
+        np.take(self.states, idx, axis=0, out=state)
+        np.take(self.actions, idx, out=action)
+        np.take(self.rewards, idx, out=reward)
+        np.take(self.next_states, idx, axis=0, out=next_state)
+        np.take(self.dones, idx, out=done)
         return state, action, reward, next_state, done
 
+    def sample(self, batch_size):
+        idx = self.rng.integers(0, self.size, size=batch_size)
+        return self._sample_into(idx)
+
     def __len__(self):
-        return len(self.buffer)
+        return self.size
+
+    def state_dict(self):
+        # copies, so the snapshot stays valid while training continues; a
+        # buffer that has not wrapped only stores its filled prefix
+        rows = slice(0, self.capacity if self.size == self.capacity else self.size)
+        arrays = {}
+        if hasattr(self, "states"):
+            arrays = {name: getattr(self, name)[rows].copy()
+                      for name in ("states", "actions", "rewards", "next_states", "dones")}
+        return {"arrays": arrays, "pos": self.pos, "size": self.size,
+                "capacity": self.capacity, "rng": self.rng.bit_generator.state}
+
+    def load_state_dict(self, state):
+        if state["capacity"] != self.capacity:
+            raise ValueError(f"Replay capacity mismatch: {state['capacity']} != {self.capacity}")
+        arrays = state["arrays"]
+        if arrays:
+            self._allocate(arrays["states"].shape[1])
+            for name, values in arrays.items():
+                getattr(self, name)[: len(values)] = values
+        self.pos = state["pos"]
+        self.size = state["size"]
+        self.rng.bit_generator.state = state["rng"]
+
+# Array-backed sum-tree over leaf priorities. Node i has children 2i and
+# 2i+1, leaves live at [capacity, 2 * capacity) and node 1 holds the total.
+class SumTree:
+    def __init__(self, capacity):
+        self.capacity = 1
+        while self.capacity < capacity:
+            self.capacity *= 2
+        self.depth = self.capacity.bit_length() - 1
+        self.tree = np.zeros(2 * self.capacity, dtype=np.float64)
+
+    def total(self):
+        return self.tree[1]
+
+    def update(self, idx, priorities):
+        # batched leaf writes, then one vectorized pass per level
+        nodes = np.asarray(idx, dtype=np.int64) + self.capacity
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values):
+        # descend all queries together: O(batch * log n)
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            left_sum = self.tree[left]
+            go_right = values > left_sum
+            values -= np.where(go_right, left_sum, 0.0)
+            nodes = left + go_right
+        return nodes - self.capacity
+
+    def get(self, idx):
+        return self.tree[np.asarray(idx) + self.capacity]
+
+
+# Proportional prioritized replay (Schaul et al.): transitions are sampled
+# with probability p_i^alpha / sum p^alpha and weighted by
+# (N * P(i))^-beta normalised to max 1.
+class PrioritizedReplayBuffer(ReplayBuffer):
+    def __init__(self, capacity=10000, state_dim=None, seed=None, alpha=0.6,
+                 beta=0.4, beta_increment=1e-4, eps=1e-5):
+        super().__init__(capacity, state_dim, seed)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.eps = eps
+        self.max_priority = 1.0
+        self.tree = SumTree(capacity)
+
+    def push(self, state, action, reward, next_state, done):
+        i = self.pos
+        super().push(state, action, reward, next_state, done)
+        self.tree.update([i], self.max_priority ** self.alpha)
+
+    def push_many(self, states, actions, rewards, next_states, dones):
+        n = min(len(states), self.capacity)
+        start = self.pos
+        super().push_many(states, actions, rewards, next_states, dones)
+        idx = (start + np.arange(n)) % self.capacity
+        self.tree.update(idx, self.max_priority ** self.alpha)
+
+    def sample(self, batch_size):
+        # stratified: one uniform draw inside each of batch_size equal segments
+        total = self.tree.total()
+        bounds = np.linspace(0.0, total, batch_size + 1)
+        values = self.rng.uniform(bounds[:-1], bounds[1:])
+        # rounding in the descent can overshoot into padding or empty slots
+        idx = np.clip(self.tree.find(values), 0, self.size - 1)
+
+        # floored at the smallest priority a stored transition can have, so a
+        # zero leaf never turns into an infinite weight
+        probs = np.maximum(self.tree.get(idx), self.eps ** self.alpha) / total
+        weights = (self.size * probs) ** -self.beta
+        weights = (weights / weights.max()).astype(np.float32)
+        self.beta = min(1.0, self.beta + self.beta_increment)
+
+        return self._sample_into(idx) + (weights, idx)
+
+    def update_priorities(self, idx, td_errors):
+        priorities = np.abs(td_errors) + self.eps
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(idx, priorities ** self.alpha)
+
+    def state_dict(self):
+        state = super().state_dict()
+        state["arrays"]["tree"] = self.tree.tree.copy()
+        state.update(max_priority=self.max_priority, beta=self.beta)
+        return state
+
+    def load_state_dict(self, state):
+        arrays = dict(state["arrays"])
+        self.tree.tree[:] = arrays.pop("tree")
+        super().load_state_dict({**state, "arrays": arrays})
+        self.max_priority = state["max_priority"]
+        self.beta = state["beta"]
 
 # DQN Agent
 class DQNAgent:
     def __init__(self, state_dim, action_dim, hidden_dim=64, lr=1e-3,
                  gamma=0.99, epsilon_start=1.0, epsilon_end=0.05,
-                 epsilon_decay=500):
+                 epsilon_decay=500, prioritized=False, per_alpha=0.6,
+                 per_beta=0.4, double_dqn=False, tau=None, gradient_steps=1,
+                 compile=False, memory_seed=None):
+        # tau: Polyak rate for soft target updates (None = hard copies);
+        # compile: run the TD target / loss through torch.compile and step a
+        # fused Adam (slightly different rounding from the default path)
         self.state_dim = state_dim
         self.action_dim = action_dim
         self.gamma = gamma
@@ -46,6 +245,9 @@ class DQNAgent:
         self.epsilon_end = epsilon_end
         self.epsilon_decay = epsilon_decay
         self.steps_done = 0
+        # set by telemetry; update() then keeps the batch's mean max-Q
+        self.track_q = False
+        self.last_max_q = None
 
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
@@ -54,13 +256,26 @@ class DQNAgent:
         self.target_net.load_state_dict(self.q_net.state_dict())
         self.target_net.eval()
 
-        self.optimizer = optim.Adam(self.q_net.parameters(), lr=lr)
-        self.memory = ReplayBuffer()
+        self.optimizer = optim.Adam(self.q_net.parameters(), lr=lr, fused=True if compile else None)
+        self.loss_fn = nn.MSELoss()
+        self.double_dqn = double_dqn
+        self.tau = tau
+        self.gradient_steps = gradient_steps
+        self._loss = torch.compile(self._td_loss) if compile else self._td_loss
+        self.prioritized = prioritized
+        if prioritized:
+            self.memory = PrioritizedReplayBuffer(state_dim=state_dim, seed=memory_seed,
+                                                  alpha=per_alpha, beta=per_beta)
+        else:
+            self.memory = ReplayBuffer(state_dim=state_dim, seed=memory_seed)
+
+    def epsilon_threshold(self):
+        return self.epsilon_end + (self.epsilon - self.epsilon_end) * \
+               np.exp(-1. * self.steps_done / self.epsilon_decay)
 
     def select_action(self, state):
         # Epsilon-greedy policy
-        eps_threshold = self.epsilon_end + (self.epsilon - self.epsilon_end) * \
-                        np.exp(-1. * self.steps_done / self.epsilon_decay)
+        eps_threshold = self.epsilon_threshold()
         self.steps_done += 1
 
         if random.random() < eps_threshold:
@@ -70,34 +285,93 @@ class DQNAgent:
             with torch.no_grad():
                 return self.q_net(state).max(1)[1].item()
 
-    def update(self, batch_size=64):
-        if len(self.memory) < batch_size:
-            return
+    def _td_loss(self, state, action, reward, next_state, done, weights):
+        # -> (loss, TD errors, mean max-Q); the unit torch.compile fuses
+        q_all = self.q_net(state)
+        q_values = q_all.gather(1, action)
+        with torch.no_grad():
+            if self.double_dqn:
+                next_action = self.q_net(next_state).argmax(1, keepdim=True)
+                next_q_values = self.target_net(next_state).gather(1, next_action)
+            else:
+                next_q_values = self.target_net(next_state).max(1)[0].unsqueeze(1)
+            expected_q_values = reward + (1 - done) * self.gamma * next_q_values
 
-        state, action, reward, next_state, done = self.memory.sample(batch_size)
+        td_errors = q_values - expected_q_values
+        if weights is None:
+            loss = self.loss_fn(q_values, expected_q_values)
+        else:
+            loss = (weights * td_errors.pow(2)).mean()
+        return loss, td_errors.detach(), q_all.detach().max(1)[0].mean()
 
-        state = torch.tensor(state, dtype=torch.float32).to(self.device)
-        action = torch.tensor(action, dtype=torch.int64).unsqueeze(1).to(self.device)
-        reward = torch.tensor(reward, dtype=torch.float32).unsqueeze(1).to(self.device)
-        next_state = torch.tensor(next_state, dtype=torch.float32).to(self.device)
-        done = torch.tensor(done, dtype=torch.float32).unsqueeze(1).to(self.device)
+    def update(self, batch_size=64, gradient_steps=None):
+        # Runs gradient_steps (default: the agent's) minibatch updates and
+        # returns the last detached loss, or None while the buffer is smaller
+        # than a batch. With tau set, each step ends with a soft target update.
+        if len(self.memory) < batch_size:
+            return None
 
-        q_values = self.q_net(state).gather(1, action)
-        next_q_values = self.target_net(next_state).max(1)[0].detach().unsqueeze(1)
-        expected_q_values = reward + (1 - done) * self.gamma * next_q_values
+        loss = None
+        for _ in range(gradient_steps or self.gradient_steps):
+            weights = None
+            if self.prioritized:
+                state, action, reward, next_state, done, weights, idx = self.memory.sample(batch_size)
+                weights = torch.from_numpy(weights).unsqueeze(1).to(self.device)
+            else:
+                state, action, reward, next_state, done = self.memory.sample(batch_size)
 
-        loss = nn.MSELoss()(q_values, expected_q_values)
+            # from_numpy shares memory with the buffer's batch arrays; .to()
+            # is a no-op on CPU
+            state = torch.from_numpy(state).to(self.device)
+            action = torch.from_numpy(action).unsqueeze(1).to(self.device)
+            reward = torch.from_numpy(reward).unsqueeze(1).to(self.device)
+            next_state = torch.from_numpy(next_state).to(self.device)
+            done = torch.from_numpy(done).unsqueeze(1).to(self.device)
 
-        self.optimizer.zero_grad()
-        loss.backward()
-        self.optimizer.step()
+            loss, td_errors, max_q = self._loss(state, action, reward, next_state, done, weights)
+            if self.track_q:
+                self.last_max_q = max_q
+            if self.prioritized:
+                self.memory.update_priorities(idx, td_errors.squeeze(1).cpu().numpy())
 
-    def update_target(self):
-        self.target_net.load_state_dict(self.q_net.state_dict())
+            self.optimizer.zero_grad()
+            loss.backward()
+            self.optimizer.step()
+            if self.tau is not None:
+                self.update_target()
+        return loss.detach()
+
+    @torch.no_grad()
+    def update_target(self, tau=None):
+        # In place: a hard copy, or Polyak averaging target += tau * (online - target)
+        tau = self.tau if tau is None else tau
+        for target, online in zip(self.target_net.parameters(), self.q_net.parameters()):
+            if tau is None:
+                target.copy_(online)
+            else:
+                target.lerp_(online, tau)
 
     def save(self, filepath="checkpoints/dqn.pth"):
         torch.save(self.q_net.state_dict(), filepath)
 
+    def state_dict(self):
+        # Everything needed to continue training exactly; see checkpointing.py
+        clone = lambda sd: {k: v.detach().clone() for k, v in sd.items()}
+        return {
+            "q_net": clone(self.q_net.state_dict()),
+            "target_net": clone(self.target_net.state_dict()),
+            "optimizer": copy.deepcopy(self.optimizer.state_dict()),
+            "steps_done": self.steps_done,
+            "memory": self.memory.state_dict(),
+        }
+
+    def load_state_dict(self, state):
+        self.q_net.load_state_dict(state["q_net"])
+        self.target_net.load_state_dict(state["target_net"])
+        self.optimizer.load_state_dict(state["optimizer"])
+        self.steps_done = state["steps_done"]
+        self.memory.load_state_dict(state["memory"])
+
     def load(self, filepath="checkpoints/dqn.pth"):
         self.q_net.load_state_dict(torch.load(filepath, map_location=self.device))
         self.target_net.load_state_dict(self.q_net.state_dict())
\ No newline at end of file
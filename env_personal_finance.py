@@ -1,7 +1,7 @@
 
 import numpy as np
 import random
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 
 
 @dataclass
@@ -132,3 +132,152 @@ class PersonalFinanceEnv:
 
     def sample_action(self):
         return int(self.rng.integers(0, self.action_dim))
+
+
+class VectorPersonalFinanceEnv:
+    # N independent PersonalFinanceEnv instances stepped together as arrays.
+    # Env i owns its own generator, and the expense draws for a whole episode
+    # are taken from it in one call at reset, which yields exactly the same
+    # sequence the scalar env would draw one step at a time.
+
+    def __init__(self, configs, num_envs: int = None, actions=None):
+        if isinstance(configs, FinanceConfig):
+            n = num_envs or 1
+            configs = [replace(configs, seed=configs.seed + i) for i in range(n)]
+        self.cfgs = list(configs)
+        self.num_envs = len(self.cfgs)
+
+        self.state_dim = 3
+        self.action_dim = 9
+
+        if actions is None:
+            ratios = [0.35,0.45,0.5, 0.55]
+            actions = np.array(
+                [[s, sv, 1 - s - sv] for s in ratios for sv in [0.2, 0.3,0.35, 0.4]]
+            )
+            actions = np.clip(actions, 0, 1)
+        else:
+            self.action_dim = len(actions)
+        self.actions = np.asarray(actions, dtype=np.float64)
+
+        self.monthly_income = np.array([c.monthly_income for c in self.cfgs], dtype=np.float64)
+        self.expense_min = np.array([c.expense_min for c in self.cfgs], dtype=np.float64)
+        self.expense_max = np.array([c.expense_max for c in self.cfgs], dtype=np.float64)
+        self.periods_per_month = np.array([c.periods_per_month for c in self.cfgs], dtype=np.int64)
+        self.horizon_months = np.array([c.horizon_months for c in self.cfgs], dtype=np.int64)
+        self.wealth_scale = self.monthly_income * self.horizon_months
+
+        self.rngs = [np.random.default_rng(c.seed) for c in self.cfgs]
+        self.action_rng = np.random.default_rng(self.cfgs[0].seed)
+
+        # one draw at reset plus one per step
+        self.episode_len = self.horizon_months * self.periods_per_month
+        self._expenses = np.zeros((self.num_envs, int(self.episode_len.max()) + 1))
+
+        n = self.num_envs
+        self.income = self.monthly_income / self.periods_per_month
+        self.t = np.zeros(n, dtype=np.int64)
+        self.month = np.zeros(n, dtype=np.int64)
+        self.period = np.zeros(n, dtype=np.int64)
+        self.done = np.zeros(n, dtype=bool)
+        self.savings = np.zeros(n)
+        self.invest = np.zeros(n)
+        self.wealth = np.zeros(n)
+        self.expense_need = np.zeros(n)
+        self._rows = np.arange(n)
+
+    def reset(self, seeds=None, monthly_income=None):
+        if seeds is not None:
+            self.rngs = [np.random.default_rng(int(s)) for s in np.broadcast_to(seeds, (self.num_envs,))]
+        if monthly_income is not None:
+            self.income = np.broadcast_to(
+                np.asarray(monthly_income, dtype=np.float64) / self.periods_per_month,
+                (self.num_envs,),
+            ).copy()
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        return self._get_state()
+
+    def _reset_envs(self, mask):
+        for i in np.flatnonzero(mask):
+            self._expenses[i, : self.episode_len[i] + 1] = self.rngs[i].uniform(
+                self.cfgs[i].expense_min, self.cfgs[i].expense_max, size=self.episode_len[i] + 1
+            )
+        # fresh arrays rather than in-place writes so info returned by the
+        # previous step keeps its values
+        self.t = np.where(mask, 0, self.t)
+        self.month = np.where(mask, 0, self.month)
+        self.period = np.where(mask, 0, self.period)
+        self.done = np.where(mask, False, self.done)
+        self.savings = np.where(mask, 0.0, self.savings)
+        self.invest = np.where(mask, 0.0, self.invest)
+        self.wealth = np.where(mask, 0.0, self.wealth)
+        self.expense_need = self._expenses[self._rows, self.t]
+
+    def _get_state(self):
+        return np.stack(
+            [
+                self.income / self.monthly_income,
+                self.expense_need / self.expense_max,
+                self.wealth / self.wealth_scale,
+            ],
+            axis=1,
+        ).astype(np.float32)
+
+    def step(self, action_idx):
+        # Envs that finish are reset in place; the returned state for them is
+        # the first state of the new episode and info["final_state"] holds
+        # the terminal one.
+        alloc = self.actions[action_idx]
+        spend_ratio, save_ratio, invest_ratio = alloc[:, 0], alloc[:, 1], alloc[:, 2]
+        income = self.income
+
+        spend_amt = income * spend_ratio
+        save_amt = income * save_ratio
+        invest_amt = income * invest_ratio
+
+        overspend = np.maximum(0.0, spend_amt - self.expense_need)
+        underspend = np.maximum(0.0, self.expense_need - spend_amt)
+
+        self.savings = self.savings + save_amt
+        self.invest = self.invest + invest_amt
+        self.wealth = self.savings + self.invest
+
+        reward = (
+            (save_amt + invest_amt) * 0.002
+            - (overspend * 0.0025)
+            + (underspend * 0.0005)
+        )
+
+        balance_penalty = np.abs(spend_ratio - 0.5) + np.abs(save_ratio - 0.25) + np.abs(invest_ratio - 0.25)
+        reward -= 0.05 * balance_penalty
+
+        self.t = self.t + 1
+        self.period = self.period + 1
+        rollover = self.period >= self.periods_per_month
+        self.month = np.where(rollover, self.month + 1, self.month)
+        self.period = np.where(rollover, 0, self.period)
+        self.done = self.month >= self.horizon_months
+
+        self.expense_need = self._expenses[self._rows, self.t]
+
+        done = self.done
+        info = {
+            "month": self.month,
+            "period": self.period,
+            "wealth": self.wealth,
+            "savings": self.savings,
+            "invest": self.invest,
+            "overspend": overspend,
+        }
+
+        state = self._get_state()
+        if done.any():
+            info["final_state"] = state
+            self._reset_envs(done)
+            state = self._get_state()
+
+        return state, reward, done, info
+
+    def sample_actions(self):
+        # separate generator so random actions never shift the expense streams
+        return self.action_rng.integers(0, self.action_dim, size=self.num_envs)
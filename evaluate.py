@@ -0,0 +1,163 @@
+"""
+evaluate.py
+
+Batched Monte Carlo evaluation of allocation policies. Episodes are run in
+chunks of VectorPersonalFinanceEnv instances; episode i is always seeded
+with `seed + i`, so its expense path matches
+PersonalFinanceEnv(FinanceConfig(seed=seed + i)) run one at a time. For
+deterministic policies the results therefore do not depend on the chunk
+size; random and epsilon-greedy policies draw from one stream across the
+chunks, so their results change with `batch_size`.
+
+A policy is any callable mapping a (n, 3) float32 state array to action
+indices (see scheduler.py); the helpers below build the common ones.
+
+Run:
+    python evaluate.py --checkpoint checkpoints/dqn.pth --episodes 10000
+"""
+
+import argparse
+from dataclasses import dataclass, replace
+from statistics import NormalDist
+
+import numpy as np
+
+from env_personal_finance import FinanceConfig, VectorPersonalFinanceEnv
+
+
+@dataclass
+class EvaluationResult:
+    rewards: np.ndarray          # total reward per episode
+    final_wealth: np.ndarray     # wealth at the end of each episode
+    overspend_steps: np.ndarray  # periods per episode with spend above need
+    steps: np.ndarray            # periods per episode
+
+    @property
+    def episodes(self) -> int:
+        return len(self.rewards)
+
+    def confidence_interval(self, values: np.ndarray, confidence: float = 0.95):
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        half = z * values.std(ddof=1) / np.sqrt(len(values)) if len(values) > 1 else 0.0
+        mean = values.mean()
+        return float(mean - half), float(mean + half)
+
+    def summary(self, confidence: float = 0.95) -> dict:
+        return {
+            "episodes": self.episodes,
+            "reward_mean": float(self.rewards.mean()),
+            "reward_std": float(self.rewards.std()),
+            "reward_ci": self.confidence_interval(self.rewards, confidence),
+            "wealth_mean": float(self.final_wealth.mean()),
+            "wealth_ci": self.confidence_interval(self.final_wealth, confidence),
+            "wealth_p5_p50_p95": [float(x) for x in np.percentile(self.final_wealth, [5, 50, 95])],
+            "overspend_frequency": float(self.overspend_steps.sum() / self.steps.sum()),
+            "overspend_episode_rate": float((self.overspend_steps > 0).mean()),
+        }
+
+
+def constant_policy(action: int = 0):
+    def policy(states):
+        return np.full(len(states), action, dtype=np.int64)
+    return policy
+
+
+def random_policy(action_dim: int = 9, seed: int = None):
+    rng = np.random.default_rng(seed)
+
+    def policy(states):
+        return rng.integers(0, action_dim, size=len(states))
+    return policy
+
+
+def epsilon_greedy_policy(q_net, epsilon: float = 0.05, action_dim: int = 9, seed: int = None):
+    from scheduler import greedy_policy
+
+    greedy = greedy_policy(q_net)
+    rng = np.random.default_rng(seed)
+
+    def policy(states):
+        actions = greedy(states)
+        explore = rng.random(len(states)) < epsilon
+        actions[explore] = rng.integers(0, action_dim, size=int(explore.sum()))
+        return actions
+    return policy
+
+
+def evaluate_policy(policy, cfg: FinanceConfig = None, episodes: int = 10000, seed: int = 0,
+                    actions=None, max_steps: int = None, batch_size: int = 4096) -> EvaluationResult:
+    # `actions` overrides the env's allocation table (e.g. a single fixed
+    # allocation); `max_steps` truncates episodes early.
+    cfg = cfg or FinanceConfig()
+    rewards = np.zeros(episodes)
+    final_wealth = np.zeros(episodes)
+    overspend_steps = np.zeros(episodes, dtype=np.int64)
+    steps = np.zeros(episodes, dtype=np.int64)
+
+    for start in range(0, episodes, batch_size):
+        n = min(batch_size, episodes - start)
+        env = VectorPersonalFinanceEnv(replace(cfg, seed=seed + start), num_envs=n, actions=actions)
+        states = env.reset()
+        running = np.ones(n, dtype=bool)
+        total = np.zeros(n)
+        wealth = np.zeros(n)
+        over = np.zeros(n, dtype=np.int64)
+        count = np.zeros(n, dtype=np.int64)
+
+        horizon = int(env.episode_len.max())
+        for _ in range(horizon if max_steps is None else min(horizon, max_steps)):
+            states, r, done, info = env.step(policy(states))
+            total += np.where(running, r, 0.0)
+            wealth = np.where(running, info["wealth"], wealth)
+            over += running & (info["overspend"] > 0)
+            count += running
+            running &= ~done
+            if not running.any():
+                break
+
+        sl = slice(start, start + n)
+        rewards[sl], final_wealth[sl], overspend_steps[sl], steps[sl] = total, wealth, over, count
+
+    return EvaluationResult(rewards, final_wealth, overspend_steps, steps)
+
+
+def evaluate_fixed_allocation(spend: float, save: float, invest: float, cfg: FinanceConfig = None,
+                              episodes: int = 10000, seed: int = 0, max_steps: int = None,
+                              batch_size: int = 4096) -> EvaluationResult:
+    return evaluate_policy(constant_policy(0), cfg, episodes, seed,
+                           actions=[[spend, save, invest]], max_steps=max_steps,
+                           batch_size=batch_size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo evaluation of allocation policies")
+    parser.add_argument("--checkpoint", type=str, default=None, help="DQN checkpoint to evaluate greedily")
+    parser.add_argument("--hidden_dim", type=int, default=64, help="Hidden size of the checkpoint's QNetwork")
+    parser.add_argument("--episodes", type=int, default=10000, help="Episodes per policy")
+    parser.add_argument("--horizon", type=int, default=120, help="Planning horizon in months")
+    parser.add_argument("--income", type=float, default=10000.0, help="Monthly income")
+    parser.add_argument("--periods_per_month", type=int, default=1, help="Number of periods per month")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first episode")
+    args = parser.parse_args()
+
+    cfg = FinanceConfig(monthly_income=args.income, horizon_months=args.horizon,
+                        periods_per_month=args.periods_per_month)
+    results = {
+        f"fixed {alloc}": evaluate_fixed_allocation(*alloc, cfg=cfg, episodes=args.episodes, seed=args.seed)
+        for alloc in [(0.5, 0.3, 0.2), (0.6, 0.2, 0.2), (0.4, 0.3, 0.3)]
+    }
+    results["random"] = evaluate_policy(random_policy(seed=args.seed), cfg, args.episodes, args.seed)
+    if args.checkpoint:
+        from model_registry import get_model
+        from scheduler import greedy_policy
+
+        q_net = get_model(args.checkpoint, args.hidden_dim)
+        results["dqn greedy"] = evaluate_policy(greedy_policy(q_net), cfg, args.episodes, args.seed)
+        results["dqn eps=0.05"] = evaluate_policy(epsilon_greedy_policy(q_net, 0.05, seed=args.seed),
+                                                  cfg, args.episodes, args.seed)
+
+    for name, result in results.items():
+        s = result.summary()
+        lo, hi = s["reward_ci"]
+        print(f"{name:>24}: reward {s['reward_mean']:.2f} [{lo:.2f}, {hi:.2f}]  "
+              f"wealth {s['wealth_mean']:.0f}  overspend {s['overspend_frequency']:.1%}")
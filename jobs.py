@@ -0,0 +1,282 @@
+"""
+jobs.py
+
+Background training jobs, so API workers never block on train_dqn. Jobs run
+in a bounded pool of spawn processes (one torch thread each) and report
+progress through a shared manager dict after every episode.
+
+    queue = JobQueue(max_workers=2)
+    job_id = queue.submit("train", {"episodes": 200, "income": 40000})
+    queue.status(job_id)   # {"status": "running", "episode": 37, "avg_reward": ...}
+    queue.cancel(job_id)
+
+Kinds:
+- "train":     train_dqn parameters (see sweep.TRAIN_KEYS)
+- "goal_plan": monthly_income, monthly_expense, months, episodes, scenarios,
+               seed; trains a policy for the goal and returns the plan rows
+               (a short fine-tune of checkpoints/base_dqn.pth when it exists)
+
+Submitting parameters identical to a queued or running job returns that
+job's id instead of starting another. Finished checkpoints are kept as
+checkpoints/jobs/<job_id>.pth next to a <job_id>.json record; records of
+done, failed and cancelled jobs are reloaded when a queue is created over the
+same directory. If a worker process dies, every job still in the pool is
+marked failed and a fresh pool is started for later submissions.
+"""
+
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from sweep import _train_params
+
+JOB_KINDS = ("train", "goal_plan")
+GOAL_PLAN_KEYS = ("monthly_income", "monthly_expense", "months", "episodes", "scenarios", "seed")
+ACTIVE = ("queued", "running")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _run_job(job_id: str, kind: str, params: dict, save_path: str, progress, cancelled):
+    import contextlib
+    import io
+
+    import torch
+
+    torch.set_num_threads(1)
+    from train import BASE_CHECKPOINT, fine_tune, train_dqn
+
+    trainer = train_dqn
+    if kind == "goal_plan" and os.path.exists(BASE_CHECKPOINT):
+        trainer = fine_tune
+        train_params = {"max_episodes": min(params.get("episodes", 150), 30),
+                        "income": params["monthly_income"], "expense": params["monthly_expense"],
+                        "horizon": params["months"], "seed": params.get("seed")}
+    elif kind == "goal_plan":
+        train_params = {"episodes": params.get("episodes", 150), "horizon": params["months"],
+                        "income": params["monthly_income"], "seed": params.get("seed")}
+    else:
+        train_params = params
+    episodes = train_params.get("episodes", train_params.get("max_episodes", 200))
+    rewards = []
+    progress[job_id] = {"status": "running", "episode": 0, "episodes": episodes, "avg_reward": None}
+
+    def on_episode(ep, reward):
+        rewards.append(float(reward))
+        progress[job_id] = {"status": "running", "episode": ep + 1, "episodes": episodes,
+                            "avg_reward": float(np.mean(rewards[-20:]))}
+        return job_id in cancelled
+
+    tmp_path = save_path + ".tmp"
+    with contextlib.redirect_stdout(io.StringIO()):
+        trainer(**train_params, save_path=tmp_path, on_episode=on_episode)
+        if job_id in cancelled:
+            os.remove(tmp_path)
+            raise JobCancelled(job_id)
+        os.replace(tmp_path, save_path)
+
+        result = {"checkpoint": save_path, "episodes": len(rewards),
+                  "final_avg_reward": float(np.mean(rewards[-20:])) if rewards else None}
+        if kind == "goal_plan":
+            from planner import generate_goal_plan
+
+            df = generate_goal_plan(params["monthly_income"], params["monthly_expense"],
+                                    params["months"], checkpoint_path=save_path,
+                                    scenarios=params.get("scenarios", 0), seed=params.get("seed"))
+            result["plan"] = df.to_dict(orient="records")
+    return result
+
+
+def job_key(kind: str, params: dict) -> str:
+    return hashlib.sha256(json.dumps({"kind": kind, "params": params}, sort_keys=True).encode()).hexdigest()
+
+
+def _validate(kind: str, params: dict) -> dict:
+    if kind == "train":
+        return _train_params(params)
+    if kind == "goal_plan":
+        unknown = set(params) - set(GOAL_PLAN_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown goal_plan parameter: {sorted(unknown)[0]}")
+        for key in ("monthly_income", "monthly_expense", "months"):
+            if key not in params:
+                raise ValueError(f"Missing goal_plan parameter: {key}")
+        return dict(params)
+    raise ValueError(f"Unknown job kind: {kind}")
+
+
+class JobQueue:
+    def __init__(self, max_workers: int = 2, checkpoint_dir: str = "checkpoints/jobs"):
+        self.checkpoint_dir = checkpoint_dir
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self.max_workers = max_workers
+        self._ctx = mp.get_context("spawn")
+        self._manager = self._ctx.Manager()
+        self._progress = self._manager.dict()
+        self._cancelled = self._manager.dict()
+        self._executor = self._new_executor()
+        self._lock = threading.Lock()
+        self._jobs: dict[str, dict] = {}
+        # job_id -> (future, the pool it runs on, job_key)
+        self._futures = {}
+        self._inflight: dict[str, str] = {}
+        self._load_finished()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self._ctx)
+
+    def _record_path(self, job_id: str) -> str:
+        return os.path.join(self.checkpoint_dir, f"{job_id}.json")
+
+    def _load_finished(self) -> None:
+        for name in os.listdir(self.checkpoint_dir):
+            if name.endswith(".json"):
+                with open(os.path.join(self.checkpoint_dir, name), "r") as f:
+                    record = json.load(f)
+                self._jobs[record["job_id"]] = record
+
+    def submit(self, kind: str, params: dict) -> str:
+        params = _validate(kind, params)
+        key = job_key(kind, params)
+        with self._lock:
+            job_id = self._inflight.get(key)
+            if job_id is not None:
+                return job_id
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {"job_id": job_id, "kind": kind, "params": params,
+                                  "status": "queued", "submitted_at": time.time()}
+            self._inflight[key] = job_id
+            save_path = os.path.join(self.checkpoint_dir, f"{job_id}.pth")
+            args = (_run_job, job_id, kind, params, save_path, self._progress, self._cancelled)
+            broken = None
+            try:
+                future = self._executor.submit(*args)
+            except BrokenProcessPool as e:
+                broken = self._executor
+                self._replace_pool(broken, f"{type(e).__name__}: {e}")
+                future = self._executor.submit(*args)
+            pool = self._executor
+            self._futures[job_id] = (future, pool, key)
+        if broken is not None:
+            broken.shutdown(wait=False, cancel_futures=True)
+        future.add_done_callback(lambda f, job_id=job_id, pool=pool: self._finish(job_id, pool, f))
+        return job_id
+
+    def _settle(self, job_id: str, record: dict) -> None:
+        # called with the lock held
+        _, _, key = self._futures.pop(job_id)
+        job = self._jobs[job_id]
+        job.update(record, finished_at=time.time())
+        self._inflight.pop(key, None)
+        self._progress.pop(job_id, None)
+        self._cancelled.pop(job_id, None)
+        if job["status"] == "done":
+            job["progress"] = {"episode": job["result"]["episodes"],
+                               "avg_reward": job["result"]["final_avg_reward"]}
+        with open(self._record_path(job_id), "w") as f:
+            json.dump(job, f)
+
+    def _replace_pool(self, broken: ProcessPoolExecutor, error: str) -> bool:
+        # called with the lock held; returns False when another thread already did it
+        if self._executor is not broken:
+            return False
+        self._executor = self._new_executor()
+        for job_id, (_, pool, _) in list(self._futures.items()):
+            if pool is broken:
+                self._settle(job_id, {"status": "failed", "error": error})
+        return True
+
+    def _finish(self, job_id: str, pool: ProcessPoolExecutor, future) -> None:
+        record = {}
+        try:
+            record["result"] = future.result()
+            record["status"] = "done"
+        except (CancelledError, JobCancelled):
+            record["status"] = "cancelled"
+        except BrokenProcessPool as e:
+            with self._lock:
+                replaced = self._replace_pool(pool, f"{type(e).__name__}: {e}")
+            if replaced:
+                pool.shutdown(wait=False, cancel_futures=True)
+            return
+        except Exception as e:
+            record["status"] = "failed"
+            record["error"] = f"{type(e).__name__}: {e}"
+
+        with self._lock:
+            if job_id in self._futures:
+                self._settle(job_id, record)
+
+    def status(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job = {k: v for k, v in job.items() if k != "result"}
+            live = self._progress.get(job_id) if job["status"] in ACTIVE else None
+        if live is not None:
+            job["status"] = live["status"]
+            job["progress"] = {k: v for k, v in live.items() if k != "status"}
+        return job
+
+    def result(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return None if job is None else job.get("result")
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] not in ACTIVE:
+                return False
+            entry = self._futures.get(job_id)
+            # a running job sees the flag at its next episode boundary
+            self._cancelled[job_id] = True
+        if entry is not None:
+            entry[0].cancel()
+        return True
+
+    def list(self) -> list[dict]:
+        with self._lock:
+            ids = list(self._jobs)
+        return [self.status(job_id) for job_id in ids]
+
+    def shutdown(self) -> None:
+        with self._lock:
+            active = [job_id for job_id, job in self._jobs.items() if job["status"] in ACTIVE]
+        for job_id in active:
+            self.cancel(job_id)
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._manager.shutdown()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a training job through the job queue")
+    parser.add_argument("--episodes", type=int, default=50)
+    parser.add_argument("--income", type=float, default=10000.0)
+    parser.add_argument("--horizon", type=int, default=120)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    queue = JobQueue(max_workers=args.workers)
+    job_id = queue.submit("train", {"episodes": args.episodes, "income": args.income,
+                                    "horizon": args.horizon})
+    try:
+        while queue.status(job_id)["status"] in ACTIVE:
+            print(queue.status(job_id))
+            time.sleep(1.0)
+        print(queue.status(job_id))
+    finally:
+        queue.shutdown()
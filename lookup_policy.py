@@ -0,0 +1,56 @@
+"""
+lookup_policy.py
+
+Greedy policy stored as a uint8 table of actions over a regular grid of the
+normalized state (income ratio, expense ratio, wealth ratio), compiled from a
+QNetwork by policy_export.export_lookup_table. A decision is one
+nearest-grid-point lookup, so serving needs neither torch nor a forward pass.
+
+The .npz holds the table plus its metadata:
+    lookup_table  uint8 (n_income, n_expense, n_wealth)
+    lows, highs   grid bounds per state dimension (inclusive)
+    disagreement  measured rate of actions differing from the network, on
+                  uniform states and on states visited by schedule rollouts
+"""
+
+import numpy as np
+
+
+class LookupTablePolicy:
+    def __init__(self, table: np.ndarray, lows, highs, disagreement: dict = None):
+        self.table = np.ascontiguousarray(table, dtype=np.uint8)
+        self.lows = np.asarray(lows, dtype=np.float32)
+        self.highs = np.asarray(highs, dtype=np.float32)
+        self.resolution = np.array(self.table.shape)
+        self.disagreement = disagreement or {}
+        self._scale = ((self.resolution - 1) / (self.highs - self.lows)).astype(np.float32)
+        self._max_idx = (self.resolution - 1).astype(np.float32)
+        self._strides = np.array([self.table.shape[1] * self.table.shape[2], self.table.shape[2], 1])
+        self._flat = self.table.ravel()
+
+    @classmethod
+    def load(cls, path: str) -> "LookupTablePolicy":
+        with np.load(path) as data:
+            disagreement = {k[len("disagreement_"):]: float(data[k])
+                            for k in data.files if k.startswith("disagreement_")}
+            return cls(data["lookup_table"], data["lows"], data["highs"], disagreement)
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(path, lookup_table=self.table, lows=self.lows, highs=self.highs,
+                            **{f"disagreement_{k}": np.float64(v) for k, v in self.disagreement.items()})
+
+    def grid_states(self) -> np.ndarray:
+        # every grid point, in table order, as float32 states
+        axes = [np.linspace(lo, hi, n, dtype=np.float32)
+                for lo, hi, n in zip(self.lows, self.highs, self.resolution)]
+        return np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, len(axes))
+
+    def index(self, states) -> np.ndarray:
+        # flat table index of the nearest grid point; states outside the
+        # bounds clamp to the edge
+        idx = np.rint((np.asarray(states, dtype=np.float32) - self.lows) * self._scale)
+        np.clip(idx, 0.0, self._max_idx, out=idx)
+        return idx.astype(np.intp) @ self._strides
+
+    def __call__(self, states) -> np.ndarray:
+        return self._flat[self.index(states)].astype(np.int64)
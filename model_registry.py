@@ -0,0 +1,87 @@
+"""
+model_registry.py
+
+Process-wide cache of loaded QNetwork instances, keyed by
+(absolute path, file mtime, hidden_dim). A checkpoint that changes on disk
+gets a new key, so the next lookup reloads it and drops the stale copy.
+Entries are evicted least-recently-used once their parameters exceed
+`max_bytes`.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from dqn_agent import load_q_network
+
+
+class ModelRegistry:
+    def __init__(self, max_bytes: int = 256 * 2**20):
+        self.max_bytes = max_bytes
+        self._models = OrderedDict()  # key -> (q_net, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    def get(self, path: str, hidden_dim: int = 64, state_dim: int = 3, action_dim: int = 9):
+        path = os.path.abspath(path)
+        key = (path, os.stat(path).st_mtime_ns, hidden_dim)
+
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # deserialize outside the lock so hits on other models are not blocked
+        q_net = load_q_network(path, state_dim, action_dim, hidden_dim)
+        nbytes = sum(p.numel() * p.element_size() for p in q_net.parameters())
+
+        with self._lock:
+            if key in self._models:
+                # another thread loaded it meanwhile
+                return self._models[key][0]
+            for stale in [k for k in self._models if k[0] == path and k[2] == hidden_dim]:
+                self._drop(stale)
+                self.reloads += 1
+            self._models[key] = (q_net, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and len(self._models) > 1:
+                self._drop(next(iter(self._models)))
+                self.evictions += 1
+        return q_net
+
+    def _drop(self, key):
+        _, nbytes = self._models.pop(key)
+        self._bytes -= nbytes
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._models),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+            }
+
+
+default_registry = ModelRegistry(
+    max_bytes=int(float(os.environ.get("MODEL_CACHE_MAX_MB", "256")) * 2**20)
+)
+
+
+def get_model(path: str, hidden_dim: int = 64):
+    return default_registry.get(path, hidden_dim)
@@ -0,0 +1,36 @@
+"""
+numpy_policy.py
+
+Pure-NumPy forward pass for an exported QNetwork (see policy_export.py).
+Importing this module does not import torch, so schedule generation can run
+in a small serving container with only NumPy installed.
+"""
+
+import numpy as np
+
+
+class NumpyPolicy:
+    def __init__(self, weights: dict):
+        # stored as (in, out) so the forward pass is x @ W + b
+        self.w1 = np.ascontiguousarray(weights["fc1.weight"].T, dtype=np.float32)
+        self.b1 = np.asarray(weights["fc1.bias"], dtype=np.float32)
+        self.w2 = np.ascontiguousarray(weights["fc2.weight"].T, dtype=np.float32)
+        self.b2 = np.asarray(weights["fc2.bias"], dtype=np.float32)
+        self.w3 = np.ascontiguousarray(weights["fc3.weight"].T, dtype=np.float32)
+        self.b3 = np.asarray(weights["fc3.bias"], dtype=np.float32)
+        self.state_dim = self.w1.shape[0]
+        self.action_dim = self.w3.shape[1]
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyPolicy":
+        with np.load(path) as data:
+            return cls({k: data[k] for k in data.files})
+
+    def q_values(self, states) -> np.ndarray:
+        x = np.asarray(states, dtype=np.float32)
+        x = np.maximum(x @ self.w1 + self.b1, 0.0)
+        x = np.maximum(x @ self.w2 + self.b2, 0.0)
+        return x @ self.w3 + self.b3
+
+    def __call__(self, states) -> np.ndarray:
+        return self.q_values(states).argmax(1)
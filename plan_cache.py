@@ -0,0 +1,177 @@
+"""
+plan_cache.py
+
+Result cache for generated plans. Keys are a SHA-256 of the canonical JSON
+of the request plus the checkpoint version (path, mtime, size), so retraining
+a checkpoint invalidates every plan built from it. An in-memory LRU tier,
+bounded by `max_entries` and by `max_bytes` of serialized JSON, sits in front
+of an optional on-disk tier of JSON files; both expire entries after `ttl`
+seconds and the disk tier is trimmed oldest-first to `max_disk_bytes`.
+
+The disk tier's sizes are tracked in memory, so a put costs O(1); the
+directory is rescanned every `rescan_every` puts to pick up files written by
+other processes sharing it.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def checkpoint_version(path: str) -> list:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return [os.path.abspath(path), None, None]
+    return [os.path.abspath(path), st.st_mtime_ns, st.st_size]
+
+
+def plan_key(payload: dict, checkpoint: str = None) -> str:
+    data = {"request": payload}
+    if checkpoint is not None:
+        data["checkpoint"] = checkpoint_version(checkpoint)
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class PlanCache:
+    def __init__(self, max_entries: int = 256, ttl: float = 3600.0,
+                 disk_dir: str = None, max_disk_bytes: int = 256 * 2**20,
+                 max_bytes: int = 64 * 2**20, rescan_every: int = 256):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.rescan_every = rescan_every
+        self._entries = OrderedDict()  # key -> (created, value, nbytes)
+        self._bytes = 0
+        self._disk_files = OrderedDict()  # path -> size, oldest first
+        self._disk_bytes = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._scan_disk()
+
+    def get(self, key: str):
+        # Returns (value, status) with status "hit", "disk" or "miss".
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1], "hit"
+                self._bytes -= self._entries.pop(key)[2]
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, "r") as f:
+                    text = f.read()
+                stored = json.loads(text)
+            except (FileNotFoundError, ValueError):
+                stored = None
+            if stored is not None:
+                if now - stored["created"] <= self.ttl:
+                    self._remember(key, stored["created"], stored["value"], len(text))
+                    with self._lock:
+                        self.disk_hits += 1
+                    return stored["value"], "disk"
+                self._remove(path)
+
+        with self._lock:
+            self.misses += 1
+        return None, "miss"
+
+    def put(self, key: str, value) -> None:
+        created = time.time()
+        encoded = json.dumps({"created": created, "value": value})
+        self._remember(key, created, value, len(encoded))
+        if self.disk_dir:
+            path = self._disk_path(key)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w") as f:
+                f.write(encoded)
+            os.replace(tmp, path)
+            with self._lock:
+                self._puts += 1
+                rescan = self._puts % self.rescan_every == 0
+                if not rescan:
+                    self._track_disk(path, len(encoded))
+            if rescan:
+                self._scan_disk()
+            self._trim_disk()
+
+    def _remember(self, key, created, value, nbytes):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (created, value, nbytes)
+            self._bytes += nbytes
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._bytes -= self._entries.popitem(last=False)[1][2]
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _remove(self, path):
+        with self._lock:
+            self._disk_bytes -= self._disk_files.pop(path, 0)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _track_disk(self, path, size):
+        # caller holds the lock
+        self._disk_bytes += size - self._disk_files.pop(path, 0)
+        self._disk_files[path] = size
+
+    def _scan_disk(self):
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".json"):
+                st = entry.stat()
+                files.append((st.st_mtime, entry.path, st.st_size))
+        with self._lock:
+            self._disk_files = OrderedDict((path, size) for _, path, size in sorted(files))
+            self._disk_bytes = sum(self._disk_files.values())
+
+    def _trim_disk(self):
+        while True:
+            with self._lock:
+                if self._disk_bytes <= self.max_disk_bytes or not self._disk_files:
+                    return
+                path = next(iter(self._disk_files))
+            self._remove(path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "disk_dir": self.disk_dir,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,157 @@
+"""
+plan_repository.py
+
+Embedded SQLite repository for saved plans, replacing CSV-plus-metadata files
+under outputs/. Each plan is a single row: metadata columns plus the plan
+rows packed with plan_store.pack_rows, written in one transaction. The
+database runs in WAL mode so readers never block the writer, connections
+are pooled across threads, and listing uses keyset pagination over the
+(created_at, plan_id) index so every page costs the same however many plans
+are stored.
+"""
+
+import json
+import math
+import os
+import queue
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+
+from plan_store import pack_rows, unpack_rows
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    plan_id    TEXT PRIMARY KEY,
+    user       TEXT,
+    title      TEXT,
+    notes      TEXT,
+    created_at REAL NOT NULL,
+    meta       TEXT,
+    n_rows     INTEGER NOT NULL,
+    rows       BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_plans_created ON plans (created_at, plan_id);
+CREATE INDEX IF NOT EXISTS idx_plans_user_created ON plans (user, created_at, plan_id);
+"""
+
+_SUMMARY_COLUMNS = "plan_id, user, title, notes, created_at, meta, n_rows"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _parse_cursor(cursor: str):
+    created_at, sep, plan_id = cursor.partition(":")
+    try:
+        created_at = float(created_at)
+    except ValueError:
+        created_at = None
+    if not sep or not plan_id or created_at is None or not math.isfinite(created_at):
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+    return created_at, plan_id
+
+
+def _summary(row) -> dict:
+    plan_id, user, title, notes, created_at, meta, n_rows = row
+    # meta first, so a meta key can never shadow a stored field
+    return {
+        **json.loads(meta or "{}"),
+        "plan_id": plan_id,
+        "user": user,
+        "title": title,
+        "notes": notes,
+        "created_at": created_at,
+        "rows": n_rows,
+    }
+
+
+class PlanRepository:
+    def __init__(self, path: str = "outputs/plans.db", pool_size: int = 8):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._pool = queue.Queue()
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                               isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+    def save(self, df, title: str = None, notes: str = None, user: str = None,
+             meta: dict = None, plan_id: str = None) -> dict:
+        plan_id = plan_id or uuid.uuid4().hex
+        created_at = time.time()
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT INTO plans (plan_id, user, title, notes, created_at, meta, n_rows, rows) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (plan_id, user, title, notes, created_at, json.dumps(meta or {}),
+                     len(df), pack_rows(df)),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return {"plan_id": plan_id, "created_at": created_at}
+
+    def get(self, plan_id: str):
+        # -> (summary dict, dict of column arrays), or None if not found
+        with self.connection() as conn:
+            row = conn.execute(
+                f"SELECT {_SUMMARY_COLUMNS}, rows FROM plans WHERE plan_id = ?", (plan_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return _summary(row[:-1]), unpack_rows(row[-1], row[6])
+
+    def list(self, user: str = None, limit: int = 50, cursor: str = None):
+        # Newest first. Returns (summaries, next_cursor); pass next_cursor back
+        # to get the following page, None means there are no more. A cursor
+        # that was not produced here raises InvalidCursor.
+        clauses, params = [], []
+        if user is not None:
+            clauses.append("user = ?")
+            params.append(user)
+        if cursor:
+            clauses.append("(created_at, plan_id) < (?, ?)")
+            params.extend(_parse_cursor(cursor))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self.connection() as conn:
+            rows = conn.execute(
+                f"SELECT {_SUMMARY_COLUMNS} FROM plans {where} "
+                "ORDER BY created_at DESC, plan_id DESC LIMIT ?",
+                (*params, limit + 1),
+            ).fetchall()
+        items = [_summary(r) for r in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = items[-1]
+            next_cursor = f"{last['created_at']!r}:{last['plan_id']}"
+        return items, next_cursor
+
+    def delete(self, plan_id: str) -> bool:
+        with self.connection() as conn:
+            cur = conn.execute("DELETE FROM plans WHERE plan_id = ?", (plan_id,))
+        return cur.rowcount > 0
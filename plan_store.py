@@ -0,0 +1,210 @@
+"""
+plan_store.py
+
+Columnar on-disk store for plans. A store is a directory holding one raw
+little-endian file per column plus `schema.json` (column dtypes and the
+committed row count) and `plans.bin` (plan_id, first row, end row per plan).
+
+Appends write column data first and commit the new row count last with an
+atomic rename, so readers never see a partial plan. Writers hold an
+exclusive lock on `append.lock` (flock, or msvcrt.locking on Windows), so
+several processes (uvicorn workers, job workers) can append to one store. Reads are np.memmap
+views over the column files: nothing is parsed and only the pages that are
+touched get read. CSV/XLSX remain available as export formats.
+
+    store = PlanStore("outputs/plan_store")
+    plan_id = store.append(df)
+    wealth = store.column("Wealth")          # memmap over every plan
+    df = store.plan(plan_id)                 # one plan as a DataFrame
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+PLAN_SCHEMA = [
+    ("plan_id", "<i8"),
+    ("Month", "<i4"),
+    ("Period", "<i4"),
+    ("Income", "<f8"),
+    ("ExpenseNeed", "<f8"),
+    ("Spend%", "<f8"),
+    ("Save%", "<f8"),
+    ("Invest%", "<f8"),
+    ("SpendAmt", "<f8"),
+    ("SaveAmt", "<f8"),
+    ("InvestAmt", "<f8"),
+    ("Wealth", "<f8"),
+]
+SCHEMA_VERSION = 1
+_INDEX_DTYPE = np.dtype([("plan_id", "<i8"), ("start", "<i8"), ("stop", "<i8")])
+
+
+def _filename(column: str) -> str:
+    return column.replace("%", "_pct") + ".bin"
+
+
+@contextmanager
+def _file_lock(path: str):
+    # exclusive lock across processes, held until the block exits
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class PlanStore:
+    def __init__(self, root: str = "outputs/plan_store"):
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        with self._locked():
+            if not os.path.exists(self._schema_path):
+                self._write_schema(0, 0)
+        with open(self._schema_path, "r") as f:
+            schema = json.load(f)
+        if schema["version"] != SCHEMA_VERSION:
+            raise ValueError(f"Unsupported plan store version {schema['version']} in {root}")
+        self.columns = [name for name, _ in schema["columns"]]
+        self.dtypes = {name: np.dtype(dtype) for name, dtype in schema["columns"]}
+
+    @contextmanager
+    def _locked(self):
+        with self._lock, _file_lock(os.path.join(self.root, "append.lock")):
+            yield
+
+    @property
+    def _schema_path(self):
+        return os.path.join(self.root, "schema.json")
+
+    def _read_counts(self):
+        with open(self._schema_path, "r") as f:
+            schema = json.load(f)
+        return schema["rows"], schema["plans"]
+
+    def _write_schema(self, rows, plans):
+        tmp = self._schema_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": SCHEMA_VERSION, "columns": PLAN_SCHEMA,
+                       "rows": rows, "plans": plans}, f)
+        os.replace(tmp, self._schema_path)
+
+    def __len__(self):
+        return self._read_counts()[0]
+
+    def append(self, df, plan_id: int = None) -> int:
+        # Appends one plan; missing columns are stored as 0.
+        n = len(df)
+        with self._locked():
+            rows, plans = self._read_counts()
+            index = self._index(plans)
+            if plan_id is None:
+                plan_id = int(index["plan_id"].max()) + 1 if plans else 1
+            for name in self.columns:
+                path = os.path.join(self.root, _filename(name))
+                if name == "plan_id":
+                    values = np.full(n, plan_id, dtype=self.dtypes[name])
+                elif name in df.columns:
+                    values = np.asarray(df[name], dtype=self.dtypes[name])
+                else:
+                    values = np.zeros(n, dtype=self.dtypes[name])
+                with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                    # overwrite anything left by an append that never committed
+                    f.truncate(rows * self.dtypes[name].itemsize)
+                    f.seek(0, os.SEEK_END)
+                    f.write(values.tobytes())
+            entry = np.array([(plan_id, rows, rows + n)], dtype=_INDEX_DTYPE)
+            with open(os.path.join(self.root, "plans.bin"), "r+b" if plans else "wb") as f:
+                f.truncate(plans * _INDEX_DTYPE.itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(entry.tobytes())
+            self._write_schema(rows + n, plans + 1)
+        return plan_id
+
+    def _index(self, plans=None):
+        if plans is None:
+            plans = self._read_counts()[1]
+        if plans == 0:
+            return np.zeros(0, dtype=_INDEX_DTYPE)
+        return np.memmap(os.path.join(self.root, "plans.bin"), dtype=_INDEX_DTYPE,
+                         mode="r", shape=(plans,))
+
+    def plan_ids(self) -> np.ndarray:
+        return np.asarray(self._index()["plan_id"])
+
+    def column(self, name: str, rows: int = None) -> np.ndarray:
+        # read-only memmap over the committed rows of one column
+        rows = self._read_counts()[0] if rows is None else rows
+        if rows == 0:
+            return np.zeros(0, dtype=self.dtypes[name])
+        return np.memmap(os.path.join(self.root, _filename(name)), dtype=self.dtypes[name],
+                         mode="r", shape=(rows,))
+
+    def read(self, columns=None) -> dict:
+        rows = self._read_counts()[0]
+        return {name: self.column(name, rows) for name in (columns or self.columns)}
+
+    def plan(self, plan_id: int, columns=None):
+        import pandas as pd
+
+        index = self._index()
+        match = np.flatnonzero(index["plan_id"] == plan_id)
+        if len(match) == 0:
+            raise KeyError(f"Plan {plan_id} not found in {self.root}")
+        start, stop = int(index["start"][match[-1]]), int(index["stop"][match[-1]])
+        data = self.read(columns or [c for c in self.columns if c != "plan_id"])
+        return pd.DataFrame({name: np.array(col[start:stop]) for name, col in data.items()})
+
+    def to_frame(self, columns=None):
+        import pandas as pd
+
+        return pd.DataFrame({name: np.asarray(col) for name, col in self.read(columns).items()})
+
+    def export(self, path: str, plan_id: int = None):
+        # CSV/XLSX export of one plan or of the whole store
+        df = self.plan(plan_id) if plan_id is not None else self.to_frame()
+        if path.endswith(".csv"):
+            df.to_csv(path, index=False)
+        elif path.endswith(".xlsx"):
+            df.to_excel(path, index=False)
+        else:
+            raise ValueError("Unsupported export format. Please use CSV or XLSX.")
+        return path
+
+
+def pack_rows(df) -> bytes:
+    # One plan's rows (without plan_id) as concatenated column bytes in
+    # PLAN_SCHEMA order; the compact form plan_repository stores as a BLOB.
+    parts = []
+    for name, dtype in PLAN_SCHEMA[1:]:
+        values = df[name] if name in df.columns else np.zeros(len(df))
+        parts.append(np.asarray(values, dtype=dtype).tobytes())
+    return b"".join(parts)
+
+
+def unpack_rows(blob: bytes, rows: int) -> dict:
+    columns, offset = {}, 0
+    for name, dtype in PLAN_SCHEMA[1:]:
+        dtype = np.dtype(dtype)
+        columns[name] = np.frombuffer(blob, dtype=dtype, count=rows, offset=offset)
+        offset += rows * dtype.itemsize
+    return columns
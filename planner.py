@@ -1,64 +1,126 @@
+import dataclasses
+import hashlib
+import json
 import numpy as np
 import pandas as pd
-import torch
-from dqn_agent import DQNAgent
-from env_personal_finance import PersonalFinanceEnv
 import os
+from env_personal_finance import VectorPersonalFinanceEnv
+from scheduler import greedy_policy, schedule_config
 
-def generate_goal_plan(monthly_income: float, monthly_expense: float, months: int, episodes: int = 150):
-    state_dim = 3
-    action_dim = 3
-    env = PersonalFinanceEnv(monthly_income, monthly_expense, months)
-    agent = DQNAgent(state_dim, action_dim)
+def goal_allocation(q_net, monthly_income: float, monthly_expense: float, months: int) -> np.ndarray:
+    # Greedy action of the trained policy at the plan's starting state,
+    # normalised to (spend, save, invest) proportions.
+    env = VectorPersonalFinanceEnv(schedule_config(monthly_income, monthly_expense, months,
+                                                   periods_per_month=1))
+    state = env.reset()
+    action = greedy_policy(q_net)(state)[0]
+    alloc = env.actions[action]
+    return alloc / np.sum(alloc)
 
-    episode_rewards = []
-    for ep in range(episodes):
-        state = env.reset()
-        total_reward = 0
-        done = False
-        while not done:
-            action = agent.select_action(state)
-            next_state, reward, done = env.step(action)
-            agent.memory.push(state, action, reward, next_state, done)
-            agent.train()
-            state = next_state
-            total_reward += reward
-        episode_rewards.append(total_reward)
-        print(f"Episode {ep+1}/{episodes} Reward: {total_reward:.2f}")
+def simulate_goal_plan(monthly_income: float, monthly_expense: float, months: int,
+                       allocation, scenarios: int = 1, seed: int = None) -> dict:
+    # Whole horizon for `scenarios` expense paths at once; every array is
+    # (scenarios, months).
+    spend_pct, save_pct, invest_pct = allocation
+    rng = np.random.default_rng(seed)
+    expense = rng.uniform(monthly_expense * 0.9, monthly_expense * 1.1, size=(scenarios, months))
+    surplus = monthly_income - expense
+    spend = np.full_like(expense, spend_pct * monthly_income)
+    save = save_pct * surplus
+    invest = invest_pct * surplus
+    return {
+        "ExpenseNeed": expense,
+        "SpendAmt": spend,
+        "SaveAmt": save,
+        "InvestAmt": invest,
+        "CumulativeWealth": np.cumsum(save + invest, axis=1),
+    }
 
-    final_action = agent.select_action(env.state)
-    proportions = final_action / np.sum(final_action)
-    spend_pct, save_pct, invest_pct = proportions
+def wealth_bands(wealth: np.ndarray, percentiles=(5, 50, 95)) -> np.ndarray:
+    # (len(percentiles), months); the last column is the final-wealth band
+    return np.percentile(wealth, percentiles, axis=0)
+
+def goal_checkpoint_path(monthly_income: float, monthly_expense: float, months: int,
+                         base_path: str = None, episodes: int = None,
+                         root: str = "checkpoints/goal") -> str:
+    # One checkpoint per goal config and policy source, so a user never gets
+    # another user's policy: fine-tunes are keyed by the base policy version
+    # (a retrained base is picked up), policies trained from scratch by the
+    # episode count
+    cfg = schedule_config(monthly_income, monthly_expense or 0.0, months, periods_per_month=1)
+    source = ({"base_mtime_ns": os.stat(base_path).st_mtime_ns} if base_path
+              else {"scratch_episodes": episodes})
+    key = json.dumps({"config": dataclasses.asdict(cfg), **source}, sort_keys=True)
+    return os.path.join(root, hashlib.sha256(key.encode()).hexdigest()[:16] + ".pth")
+
+def load_goal_policy(checkpoint_path: str, monthly_income: float, months: int, episodes: int,
+                     monthly_expense: float = None):
+    # checkpoint_path=None picks the policy for this goal: a short fine-tune
+    # of the base policy (train.py --base) when one exists, otherwise a policy
+    # trained once from scratch; both are kept under goal_checkpoint_path
+    from model_registry import get_model
+    from train import BASE_CHECKPOINT, fine_tune, train_dqn
+
+    if checkpoint_path is None and os.path.exists(BASE_CHECKPOINT) and monthly_expense is not None:
+        checkpoint_path = goal_checkpoint_path(monthly_income, monthly_expense, months, BASE_CHECKPOINT)
+        if not os.path.exists(checkpoint_path):
+            fine_tune(monthly_income, monthly_expense, months, save_path=checkpoint_path,
+                      max_episodes=min(episodes, 30))
+        return get_model(checkpoint_path)
+
+    if checkpoint_path is None:
+        checkpoint_path = goal_checkpoint_path(monthly_income, monthly_expense, months,
+                                               episodes=episodes)
+    if not os.path.exists(checkpoint_path):
+        # first run only: train once and reuse the checkpoint afterwards
+        expense_range = (0.9 * monthly_expense, 1.1 * monthly_expense) if monthly_expense else None
+        train_dqn(episodes=episodes, horizon=months, income=monthly_income,
+                  expense_range=expense_range, save_path=checkpoint_path)
+    return get_model(checkpoint_path)
+
+def generate_goal_plan(monthly_income: float, monthly_expense: float, months: int, episodes: int = 150,
+                       checkpoint_path: str = None, scenarios: int = 0,
+                       percentiles=(5, 50, 95), seed: int = None):
+    q_net = load_goal_policy(checkpoint_path, monthly_income, months, episodes, monthly_expense)
+    spend_pct, save_pct, invest_pct = goal_allocation(q_net, monthly_income, monthly_expense, months)
 
     print("\nOptimal Allocation Learned:")
     print(f"Spend: {spend_pct*100:.2f}%  |  Save: {save_pct*100:.2f}%  |  Invest: {invest_pct*100:.2f}%")
 
-    records = []
-    balance = 0
-    for m in range(1, months + 1):
-        expense = np.random.uniform(monthly_expense * 0.9, monthly_expense * 1.1)
-        spend = spend_pct * monthly_income
-        save = save_pct * (monthly_income - expense)
-        invest = invest_pct * (monthly_income - expense)
-        balance += save + invest
-        records.append({
-            "Month": m,
-            "Income": monthly_income,
-            "ExpenseNeed": expense,
-            "SpendAmt": round(spend, 2),
-            "SaveAmt": round(save, 2),
-            "InvestAmt": round(invest, 2),
-            "CumulativeWealth": round(balance, 2)
-        })
+    # row 0 is the plan itself; the rest are Monte Carlo expense scenarios
+    sim = simulate_goal_plan(monthly_income, monthly_expense, months,
+                             (spend_pct, save_pct, invest_pct), scenarios=1 + scenarios, seed=seed)
+
+    df = pd.DataFrame({
+        "Month": np.arange(1, months + 1),
+        "Income": monthly_income,
+        "ExpenseNeed": sim["ExpenseNeed"][0],
+        "SpendAmt": np.round(sim["SpendAmt"][0], 2),
+        "SaveAmt": np.round(sim["SaveAmt"][0], 2),
+        "InvestAmt": np.round(sim["InvestAmt"][0], 2),
+        "CumulativeWealth": np.round(sim["CumulativeWealth"][0], 2),
+    })
+
+    if scenarios > 0:
+        bands = wealth_bands(sim["CumulativeWealth"][1:], percentiles)
+        for p, band in zip(percentiles, bands):
+            df[f"Wealth_P{p:g}"] = np.round(band, 2)
+        print(f"\nFinal wealth over {scenarios} scenarios:")
+        print("  ".join(f"P{p:g}: {band[-1]:.2f}" for p, band in zip(percentiles, bands)))
+
+    from plan_store import PlanStore
 
-    df = pd.DataFrame(records)
+    plan_id = PlanStore().append(df.assign(**{
+        "Period": 1, "Spend%": spend_pct, "Save%": save_pct, "Invest%": invest_pct,
+        "Wealth": df["CumulativeWealth"],
+    }))
     os.makedirs("outputs", exist_ok=True)
     df.to_csv("outputs/goal_plan.csv", index=False)
-    print("\nGoal plan saved to outputs/goal_plan.csv")
+    print(f"\nGoal plan {plan_id} stored in outputs/plan_store and exported to outputs/goal_plan.csv")
     return df
 
 if __name__ == "__main__":
     income = float(input("Enter your monthly income: "))
     expense = float(input("Enter your average monthly expense: "))
     months = int(input("Enter number of months for goal planning: "))
-    generate_goal_plan(income, expense, months)
+    generate_goal_plan(income, expense, months, scenarios=500)
@@ -0,0 +1,217 @@
+"""
+policy_export.py
+
+Exports a trained QNetwork to inference artifacts that avoid eager PyTorch
+dispatch per decision:
+
+- TorchScript (traced and frozen), optionally with dynamic int8
+  quantization of the Linear layers;
+- a .npz of the weights for numpy_policy.NumpyPolicy, which needs no torch;
+- a uint8 lookup table of greedy actions over a grid spanning the states
+  the environment can reach (reachable_bounds) for
+  lookup_policy.LookupTablePolicy (no torch, no forward pass).
+
+Every export is checked against the eager network on random states before
+it is written; an artifact whose greedy actions disagree more than allowed
+raises ValueError instead of being saved.
+
+Run:
+    python policy_export.py --checkpoint checkpoints/dqn.pth --out_dir exports
+"""
+
+import argparse
+import os
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from dqn_agent import load_q_network
+from lookup_policy import LookupTablePolicy
+from numpy_policy import NumpyPolicy
+
+# 13 income-ratio points land exactly on 1 / periods_per_month for 1, 2, 3,
+# 4, 6 and 12 periods per month
+LOOKUP_RESOLUTION = (13, 64, 64)
+
+
+def parity_states(n: int = 4096, state_dim: int = 3, seed: int = 0) -> np.ndarray:
+    # normalized states cover roughly [0, 1]; a small margin catches extrapolation
+    return np.random.default_rng(seed).uniform(0.0, 1.2, size=(n, state_dim)).astype(np.float32)
+
+
+def check_parity(q_net, q_values_fn, n: int = 4096, seed: int = 0) -> dict:
+    # q_values_fn maps a float32 state array to an array of Q-values
+    states = parity_states(n, seed=seed)
+    with torch.no_grad():
+        expected = q_net(torch.from_numpy(states)).numpy()
+    actual = np.asarray(q_values_fn(states))
+    return {
+        "max_abs_diff": float(np.abs(actual - expected).max()),
+        "action_agreement": float((actual.argmax(1) == expected.argmax(1)).mean()),
+    }
+
+
+def _check(report: dict, min_agreement: float, what: str) -> dict:
+    if report["action_agreement"] < min_agreement:
+        raise ValueError(f"{what} export agrees with the eager network on only "
+                         f"{report['action_agreement']:.2%} of actions (need {min_agreement:.2%})")
+    return report
+
+
+def export_torchscript(q_net, path: str, quantize: bool = True, min_agreement: float = None) -> dict:
+    # int8 weights can flip argmax between nearly tied actions, so the
+    # quantized artifact gets a looser default gate
+    if min_agreement is None:
+        min_agreement = 0.95 if quantize else 0.999
+    model = q_net.eval()
+    if quantize:
+        from torch.ao.quantization import quantize_dynamic
+
+        model = quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    with torch.no_grad():
+        scripted = torch.jit.freeze(torch.jit.trace(model, torch.zeros(1, 3)).eval())
+
+    def q_values(states):
+        with torch.no_grad():
+            return scripted(torch.from_numpy(states)).numpy()
+
+    report = _check(check_parity(q_net, q_values), min_agreement,
+                    "Quantized TorchScript" if quantize else "TorchScript")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    torch.jit.save(scripted, path)
+    return report
+
+
+def export_numpy(q_net, path: str, min_agreement: float = 0.999) -> dict:
+    weights = {k: v.detach().cpu().numpy() for k, v in q_net.state_dict().items()}
+    report = _check(check_parity(q_net, NumpyPolicy(weights).q_values), min_agreement, "NumPy")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez(path, **weights)
+    return report
+
+
+def rollout_states(n_configs: int = 256, seed: int = 0) -> np.ndarray:
+    # States visited by random-action schedule rollouts over a spread of
+    # incomes, expense shares, horizons and periods per month
+    from env_personal_finance import VectorPersonalFinanceEnv
+    from scheduler import schedule_config
+
+    rng = np.random.default_rng(seed)
+    configs = []
+    for i in range(n_configs):
+        income = float(np.exp(rng.uniform(np.log(2000.0), np.log(200000.0))))
+        configs.append(schedule_config(income, income * rng.uniform(0.2, 0.9),
+                                       int(rng.integers(6, 121)),
+                                       periods_per_month=int(rng.choice([1, 2, 4])), seed=i))
+    env = VectorPersonalFinanceEnv(configs)
+    states = [env.reset()]
+    active = np.ones(env.num_envs, dtype=bool)
+    for _ in range(int(env.episode_len.max()) - 1):
+        next_states, _, done, _ = env.step(env.sample_actions())
+        active &= ~done
+        states.append(next_states[active])
+    return np.concatenate(states)
+
+
+def reachable_bounds():
+    # (lows, highs) of the normalized state under scheduler.schedule_config:
+    # - income ratio: [0, 1], so the income grid lands on 1 / periods_per_month
+    # - expense ratio: the need is drawn in [expense_min, expense_max] and
+    #   divided by expense_max, so it never drops below their ratio (~0.82)
+    # - wealth ratio: every period adds at most (1 - spend share) of its
+    #   income and there are no returns, so the lowest spend share caps it
+    from env_personal_finance import PersonalFinanceEnv
+    from scheduler import schedule_config
+
+    env = PersonalFinanceEnv(schedule_config(1.0, 1.0, 1))
+    expense_low = env.cfg.expense_min / env.cfg.expense_max
+    wealth_high = 1.0 - float(env.actions[:env.action_dim, 0].min())
+    return (0.0, expense_low, 0.0), (1.0, 1.0, wealth_high)
+
+
+def compile_lookup_table(q_net, resolution=LOOKUP_RESOLUTION, lows=None, highs=None,
+                         chunk: int = 65536) -> LookupTablePolicy:
+    # Greedy action of q_net at every grid point, plus the measured
+    # disagreement with q_net on uniform states within the bounds and on
+    # rollout states. The bounds default to reachable_bounds().
+    if lows is None or highs is None:
+        default_lows, default_highs = reachable_bounds()
+        lows = default_lows if lows is None else lows
+        highs = default_highs if highs is None else highs
+    table = np.zeros(tuple(resolution), dtype=np.uint8)
+    policy = LookupTablePolicy(table, lows, highs)
+    grid = policy.grid_states()
+    flat = table.reshape(-1)
+    with torch.no_grad():
+        for start in range(0, len(grid), chunk):
+            q = q_net(torch.from_numpy(grid[start:start + chunk]))
+            flat[start:start + chunk] = q.argmax(1).numpy()
+    policy = LookupTablePolicy(table, lows, highs)
+
+    uniform = np.random.default_rng(0).uniform(policy.lows, policy.highs,
+                                               size=(100_000, 3)).astype(np.float32)
+    for name, states in (("uniform", uniform), ("rollouts", rollout_states())):
+        with torch.no_grad():
+            expected = q_net(torch.from_numpy(states)).argmax(1).numpy()
+        policy.disagreement[name] = float((policy(states) != expected).mean())
+    return policy
+
+
+def export_lookup_table(q_net, path: str, resolution=LOOKUP_RESOLUTION,
+                        min_agreement: float = 0.99) -> dict:
+    # gated on the states schedules actually visit; the uniform rate over the
+    # reachable bounds is reported alongside
+    policy = compile_lookup_table(q_net, resolution)
+    report = {
+        "action_agreement": 1.0 - policy.disagreement["rollouts"],
+        "uniform_agreement": 1.0 - policy.disagreement["uniform"],
+        "table_bytes": policy.table.nbytes,
+    }
+    _check(report, min_agreement, "Lookup table")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    policy.save(path)
+    report["file_bytes"] = os.path.getsize(path)
+    return report
+
+
+def load_torchscript_policy(path: str):
+    scripted = torch.jit.load(path)
+    scripted.eval()
+
+    def policy(states):
+        with torch.no_grad():
+            return scripted(torch.from_numpy(states)).argmax(1).numpy()
+
+    return policy
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a QNetwork checkpoint for fast CPU inference")
+    parser.add_argument("--checkpoint", type=str, default="checkpoints/scheduler_dqn.pth", help="Checkpoint to export")
+    parser.add_argument("--hidden_dim", type=int, default=64, help="Hidden size of the checkpoint's QNetwork")
+    parser.add_argument("--out_dir", type=str, default="exports", help="Directory for the artifacts")
+    args = parser.parse_args()
+
+    q_net = load_q_network(args.checkpoint, hidden_dim=args.hidden_dim)
+    name = os.path.splitext(os.path.basename(args.checkpoint))[0]
+    artifacts = {
+        f"{name}.ts": lambda p: export_torchscript(q_net, p, quantize=False),
+        f"{name}.int8.ts": lambda p: export_torchscript(q_net, p, quantize=True),
+        f"{name}.npz": lambda p: export_numpy(q_net, p),
+        f"{name}.lut.npz": lambda p: export_lookup_table(q_net, p),
+    }
+    for filename, export in artifacts.items():
+        path = os.path.join(args.out_dir, filename)
+        try:
+            report = export(path)
+        except ValueError as e:
+            print(f"{path}: skipped ({e})")
+            continue
+        if "table_bytes" in report:
+            print(f"{path}: action agreement = {report['action_agreement']:.2%} on rollouts, "
+                  f"{report['uniform_agreement']:.2%} on uniform states, "
+                  f"{report['file_bytes'] / 1024:.1f} KiB on disk")
+            continue
+        print(f"{path}: max |dQ| = {report['max_abs_diff']:.2e}, "
+              f"action agreement = {report['action_agreement']:.2%}")
@@ -0,0 +1,121 @@
+"""
+policy_server.py
+
+Keeps a QNetwork loaded and warm and micro-batches schedule requests: requests
+that arrive within `max_wait_ms` of each other (up to `max_batch_size`) are
+rolled out together by scheduler.rollout_schedules, so each planning period
+costs one forward pass for the whole batch. Rollouts run in a worker thread
+so the event loop stays free to accept requests.
+
+The network comes from model_registry, looked up once per batch, so a
+checkpoint rewritten on disk is picked up without restarting the server.
+Alternatively pass a ready policy callable (e.g. numpy_policy.NumpyPolicy);
+torch is then never imported.
+
+stop() drains: requests queued before it are still answered, and a request
+made after it is rolled out on its own instead of being batched.
+"""
+
+import asyncio
+
+from scheduler import greedy_policy, rollout_schedules
+
+
+class PolicyServer:
+    def __init__(self, checkpoint_path: str = None, hidden_dim: int = 64,
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0,
+                 registry=None, policy=None):
+        self.checkpoint_path = checkpoint_path
+        self.hidden_dim = hidden_dim
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.policy = policy
+        if policy is None and registry is None:
+            from model_registry import default_registry
+
+            registry = default_registry
+        self.registry = registry
+        # load eagerly so a bad checkpoint fails at construction
+        self.current_policy()
+        self.requests = 0
+        self.batches = 0
+        self._queue = None
+        self._task = None
+        self._closed = False
+
+    def current_policy(self):
+        if self.policy is not None:
+            return self.policy
+        q_net = self.registry.get(self.checkpoint_path, self.hidden_dim)
+        return greedy_policy(q_net)
+
+    def _rollout(self, configs):
+        return rollout_schedules(self.current_policy(), configs)
+
+    async def start(self):
+        if self._task is None and not self._closed:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._batch_loop())
+
+    async def stop(self):
+        self._closed = True
+        if self._task is not None:
+            # None tells the batch loop to exit once the queue ahead of it is served
+            self._queue.put_nowait(None)
+            await self._task
+            self._task = None
+
+    async def schedule(self, cfg) -> dict:
+        if self._closed:
+            loop = asyncio.get_running_loop()
+            return (await loop.run_in_executor(None, self._rollout, [cfg]))[0]
+        await self.start()
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((cfg, fut))
+        return await fut
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size and batch[-1] is not None:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _batch_loop(self):
+        while True:
+            items = await self._next_batch()
+            await self._run_batch([(cfg, fut) for cfg, fut in filter(None, items) if not fut.done()])
+            if items[-1] is None:
+                return
+
+    async def _run_batch(self, batch):
+        if not batch:
+            return
+        self.requests += len(batch)
+        self.batches += 1
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                None, self._rollout, [cfg for cfg, _ in batch]
+            )
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for (_, fut), result in zip(batch, results):
+            if not fut.done():
+                fut.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+        }
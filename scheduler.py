@@ -0,0 +1,192 @@
+"""
+scheduler.py
+
+Rolls an allocation policy forward through VectorPersonalFinanceEnv to build
+period-by-period budget schedules. Any number of requests are stepped
+together, so the policy sees one (n_active, 3) batch of states per period
+instead of one state at a time.
+
+A policy is any callable mapping a float32 array of normalized states
+(see PersonalFinanceEnv._get_state) to an integer array of action indices.
+"""
+
+import numpy as np
+
+from env_personal_finance import FinanceConfig, VectorPersonalFinanceEnv
+
+SCHEDULE_COLUMNS = [
+    "Month", "Period", "Income", "ExpenseNeed", "Spend%", "Save%", "Invest%",
+    "SpendAmt", "SaveAmt", "InvestAmt", "Wealth",
+]
+
+
+def schedule_config(monthly_income: float, avg_monthly_expense: float, plan_months: int,
+                    periods_per_month: int = 2, seed: int = 42) -> FinanceConfig:
+    # expense need per period is drawn within +/-10% of the average
+    per_period = avg_monthly_expense / periods_per_month
+    return FinanceConfig(
+        monthly_income=monthly_income,
+        expense_min=0.9 * per_period,
+        expense_max=1.1 * per_period,
+        periods_per_month=periods_per_month,
+        horizon_months=plan_months,
+        seed=seed,
+    )
+
+
+def greedy_policy(q_net, device="cpu"):
+    import torch
+
+    def policy(states):
+        with torch.no_grad():
+            q = q_net(torch.from_numpy(states).to(device))
+        return q.argmax(1).cpu().numpy()
+
+    return policy
+
+
+def load_policy(path: str):
+    # .npz -> NumpyPolicy, a lookup_policy table or a dp_planner table (no
+    # torch), .ts -> TorchScript export, else a QNetwork checkpoint through
+    # model_registry
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            keys = set(data.files)
+        if "lookup_table" in keys:
+            from lookup_policy import LookupTablePolicy
+
+            return LookupTablePolicy.load(path)
+        if "policy_table" in keys:
+            from dp_planner import DPPolicy
+
+            policy = DPPolicy.load(path)
+            if not policy.stationary:
+                # shared servers batch requests at different periods
+                raise ValueError(f"{path} is a non-stationary DP table; it needs a stage index "
+                                 "and cannot be served")
+            return policy
+        from numpy_policy import NumpyPolicy
+
+        return NumpyPolicy.load(path)
+    if path.endswith(".ts"):
+        from policy_export import load_torchscript_policy
+
+        return load_torchscript_policy(path)
+    from model_registry import get_model
+
+    return greedy_policy(get_model(path))
+
+
+def iter_schedule_steps(policy, configs):
+    # Yields (env_idx, columns) per period: the indices of requests still in
+    # their first episode and the schedule columns for exactly those rows.
+    env = VectorPersonalFinanceEnv(configs)
+    states = env.reset()
+    active = np.ones(env.num_envs, dtype=bool)
+
+    for _ in range(int(env.episode_len.max())):
+        idx = np.flatnonzero(active)
+        if len(idx) == 0:
+            break
+        actions = np.zeros(env.num_envs, dtype=np.int64)
+        actions[idx] = policy(states[idx])
+
+        alloc = env.actions[actions[idx]]
+        income = env.income[idx]
+        columns = {
+            "Month": env.month[idx] + 1,
+            "Period": env.period[idx] + 1,
+            "Income": income,
+            "ExpenseNeed": env.expense_need[idx],
+            "Spend%": alloc[:, 0],
+            "Save%": alloc[:, 1],
+            "Invest%": alloc[:, 2],
+            "SpendAmt": income * alloc[:, 0],
+            "SaveAmt": income * alloc[:, 1],
+            "InvestAmt": income * alloc[:, 2],
+        }
+
+        states, _, done, info = env.step(actions)
+        columns["Wealth"] = info["wealth"][idx]
+        active &= ~done
+        yield idx, columns
+
+
+def rollout_schedules(policy, configs) -> list[dict]:
+    # One dict of column arrays per config, in SCHEDULE_COLUMNS order.
+    lengths = [c.horizon_months * c.periods_per_month for c in configs]
+    table = {col: np.zeros((len(configs), max(lengths))) for col in SCHEDULE_COLUMNS}
+    for step, (idx, columns) in enumerate(iter_schedule_steps(policy, configs)):
+        for col, values in columns.items():
+            table[col][idx, step] = values
+
+    schedules = []
+    for i, n in enumerate(lengths):
+        schedule = {col: table[col][i, :n] for col in SCHEDULE_COLUMNS}
+        schedule["Month"] = schedule["Month"].astype(np.int64)
+        schedule["Period"] = schedule["Period"].astype(np.int64)
+        schedules.append(schedule)
+    return schedules
+
+
+def iter_schedule_rows(policy, cfg):
+    # One schedule row dict at a time, straight from the rollout, so long
+    # horizons are never materialized.
+    for _, columns in iter_schedule_steps(policy, [cfg]):
+        yield {col: columns[col][0].item() for col in SCHEDULE_COLUMNS}
+
+
+def stream_schedule(policy, cfg, fmt: str = "ndjson", chunk_rows: int = 256):
+    # Text chunks of an NDJSON or CSV rendering of the schedule. The first
+    # row is flushed on its own so clients see data immediately.
+    import csv
+    import io
+    import json
+
+    if fmt not in ("ndjson", "csv"):
+        raise ValueError(f"Unsupported stream format: {fmt}")
+
+    buf = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(buf, fieldnames=SCHEDULE_COLUMNS, lineterminator="\n")
+        writer.writeheader()
+
+    pending = 0
+    first = True
+    for row in iter_schedule_rows(policy, cfg):
+        if writer is not None:
+            writer.writerow(row)
+        else:
+            buf.write(json.dumps(row) + "\n")
+        pending += 1
+        if first or pending >= chunk_rows:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            pending = 0
+            first = False
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def to_frame(schedule: dict):
+    import pandas as pd
+
+    return pd.DataFrame(schedule, columns=SCHEDULE_COLUMNS)
+
+
+def to_records(schedule: dict) -> list[dict]:
+    columns = [schedule[col].tolist() for col in SCHEDULE_COLUMNS]
+    return [dict(zip(SCHEDULE_COLUMNS, row)) for row in zip(*columns)]
+
+
+def generate_schedule(monthly_income: float, avg_monthly_expense: float, plan_months: int,
+                      checkpoint_path: str = "checkpoints/scheduler_dqn.pth",
+                      periods_per_month: int = 2, seed: int = 42, hidden_dim: int = 64):
+    from model_registry import get_model
+
+    policy = greedy_policy(get_model(checkpoint_path, hidden_dim))
+    cfg = schedule_config(monthly_income, avg_monthly_expense, plan_months,
+                          periods_per_month, seed)
+    return to_frame(rollout_schedules(policy, [cfg])[0])
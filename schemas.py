@@ -0,0 +1,25 @@
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+
+
+class ScheduleRequest(BaseModel):
+    monthly_income: float = Field(..., gt=0)
+    avg_expense: float = Field(..., gt=0)
+    plan_months: int = Field(..., gt=0)
+    episodes: Optional[int] = Field(200, gt=0)
+    checkpoint: Optional[str] = Field(None, description="Optional checkpoint path to load/save model")
+
+
+class JobRequest(BaseModel):
+    kind: Literal["train", "goal_plan"] = "train"
+    params: dict = Field(default_factory=dict)
+
+
+class SavePlanRequest(BaseModel):
+    title: Optional[str] = None
+    notes: Optional[str] = None
+    user: Optional[str] = None
+    plan: list[dict] = Field(..., min_length=1)
+    monthly_income: Optional[float] = None
+    avg_monthly_expense: Optional[float] = None
+    plan_months: Optional[int] = None
@@ -0,0 +1,123 @@
+"""
+serve.py
+
+Lightweight serving entry point for schedule generation. Only what inference
+needs is imported at startup (FastAPI, NumPy, the env and the rollout code);
+the policy is loaded on startup from SERVE_POLICY:
+
+- *.npz  -> numpy_policy.NumpyPolicy, or lookup_policy.LookupTablePolicy for a
+           .lut.npz (dp_planner tables likewise); torch is never imported
+- *.ts   -> TorchScript export (imports torch on load)
+- *.pth  -> eager checkpoint through model_registry (imports torch on load)
+
+Export an .npz with policy_export.py to run without torch installed.
+
+Run:
+    SERVE_POLICY=exports/scheduler_dqn.npz uvicorn serve:app --port 8000
+    python serve.py --policy exports/scheduler_dqn.npz --measure-startup
+
+POST /schedule?stream=ndjson|csv streams rows as they are rolled out.
+GET /health reports startup timings and whether torch/pandas were loaded.
+"""
+
+import time
+
+_T0 = time.perf_counter()
+
+import os
+import sys
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Literal, Optional
+
+from policy_server import PolicyServer
+from scheduler import load_policy, schedule_config, stream_schedule, to_records
+from schemas import ScheduleRequest
+
+DEFAULT_POLICY = "exports/scheduler_dqn.npz"
+IMPORT_SECONDS = time.perf_counter() - _T0
+
+timings = {"import_seconds": IMPORT_SECONDS}
+_server = None
+
+
+def get_server() -> PolicyServer:
+    global _server
+    if _server is None:
+        start = time.perf_counter()
+        path = os.environ.get("SERVE_POLICY", DEFAULT_POLICY)
+        _server = PolicyServer(
+            policy=load_policy(path),
+            max_batch_size=int(os.environ.get("SCHEDULE_MAX_BATCH", "32")),
+            max_wait_ms=float(os.environ.get("SCHEDULE_MAX_WAIT_MS", "5")),
+        )
+        timings["policy_load_seconds"] = time.perf_counter() - start
+        timings["policy"] = path
+    return _server
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await get_server().start()
+    timings["ready_seconds"] = time.perf_counter() - _T0
+    yield
+    await get_server().stop()
+
+
+app = FastAPI(title="Smart Budget Manager - Schedule Serving", lifespan=lifespan)
+
+
+@app.post("/schedule")
+async def create_schedule(req: ScheduleRequest,
+                          stream: Optional[Literal["ndjson", "csv"]] = None):
+    cfg = schedule_config(req.monthly_income, req.avg_expense, req.plan_months)
+    if stream:
+        media_type = "application/x-ndjson" if stream == "ndjson" else "text/csv"
+        return StreamingResponse(stream_schedule(get_server().current_policy(), cfg, stream),
+                                 media_type=media_type)
+    try:
+        schedule = await get_server().schedule(cfg)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"schedule": to_records(schedule)}
+
+
+@app.get("/health")
+def health():
+    return {
+        **timings,
+        "torch_loaded": "torch" in sys.modules,
+        "pandas_loaded": "pandas" in sys.modules,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Lightweight schedule serving")
+    parser.add_argument("--policy", type=str, default=None, help="Policy artifact (.npz, .ts or .pth)")
+    parser.add_argument("--measure-startup", action="store_true", help="Time startup and the first request, then exit")
+    parser.add_argument("--port", type=int, default=8000, help="Port for uvicorn")
+    args = parser.parse_args()
+    if args.policy:
+        os.environ["SERVE_POLICY"] = args.policy
+
+    if args.measure_startup:
+        async def first_request():
+            server = get_server()
+            start = time.perf_counter()
+            await server.schedule(schedule_config(40000, 12000, 12))
+            timings["first_request_seconds"] = time.perf_counter() - start
+            await server.stop()
+
+        asyncio.run(first_request())
+        timings["total_seconds"] = time.perf_counter() - _T0
+        for key, value in health().items():
+            print(f"{key}: {value}")
+    else:
+        import uvicorn
+
+        uvicorn.run(app, host="0.0.0.0", port=args.port)
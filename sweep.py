@@ -0,0 +1,177 @@
+"""
+sweep.py
+
+Runs train_dqn over a grid or list of configurations in parallel, one
+process per run with a single torch thread each. Every finished episode is
+appended to a JSON-lines results file as it happens, so partial sweeps are
+still usable, and a run that raises or crashes is recorded and skipped
+instead of taking the sweep down.
+
+Run:
+    python sweep.py --config config.yaml --workers 8 --results outputs/sweep.jsonl
+
+The YAML file may hold a base config (the keys train_dqn accepts, plus
+`steps_per_ep` as an alias for `horizon`) and a `sweep` section with either
+`grid` (every combination of the listed values) or `runs` (explicit list):
+
+    sweep:
+      grid:
+        lr: [0.001, 0.0005]
+        seed: [1, 2, 3]
+
+Result lines:
+    {"run_id": ..., "event": "episode", "episode": 0, "reward": ...}
+    {"run_id": ..., "event": "done" | "error" | "crashed", ...}
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing as mp
+import os
+import time
+import traceback
+from multiprocessing.connection import wait
+
+import numpy as np
+
+TRAIN_KEYS = (
+    "episodes", "target_update", "batch_size", "horizon", "income",
+    "periods_per_month", "prioritized", "lr", "gamma", "epsilon_decay",
+    "hidden_dim", "seed", "train_freq", "gradient_steps", "double_dqn", "tau",
+)
+ALIASES = {"steps_per_ep": "horizon"}
+# exit code of a run that raised and already logged its traceback; any other
+# non-zero code (including 1 from an import error) is reported as a crash
+HANDLED_FAILURE = 3
+
+
+def expand_grid(grid: dict) -> list[dict]:
+    keys = list(grid)
+    values = [v if isinstance(v, (list, tuple)) else [v] for v in grid.values()]
+    return [dict(zip(keys, combo)) for combo in itertools.product(*values)]
+
+
+def _train_params(cfg: dict) -> dict:
+    params = {}
+    for key, value in cfg.items():
+        key = ALIASES.get(key, key)
+        if key not in TRAIN_KEYS:
+            raise ValueError(f"Unknown sweep parameter: {key}")
+        params[key] = value
+    return params
+
+
+def load_sweep(path: str) -> list[dict]:
+    import yaml
+
+    with open(path, "r") as f:
+        data = yaml.safe_load(f) or {}
+    spec = data.pop("sweep", {}) or {}
+    base = {k: v for k, v in data.items() if ALIASES.get(k, k) in TRAIN_KEYS}
+
+    if "runs" in spec:
+        runs = spec["runs"]
+    elif "grid" in spec:
+        runs = expand_grid(spec["grid"])
+    else:
+        runs = [{}]
+    return [_train_params({**base, **run}) for run in runs]
+
+
+def _append(results_path: str, record: dict) -> None:
+    # a single O_APPEND write per line keeps concurrent writers from interleaving
+    line = (json.dumps(record) + "\n").encode()
+    fd = os.open(results_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def _run_one(run_id: str, params: dict, results_path: str, save_dir: str) -> None:
+    import contextlib
+    import io
+
+    import torch
+
+    torch.set_num_threads(1)
+    from train import train_dqn
+
+    def on_episode(ep, reward):
+        _append(results_path, {"run_id": run_id, "event": "episode",
+                               "episode": ep, "reward": float(reward)})
+
+    start = time.time()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            rewards = train_dqn(**params, on_episode=on_episode,
+                                save_path=os.path.join(save_dir, f"{run_id}.pth"))
+    except Exception:
+        _append(results_path, {"run_id": run_id, "event": "error", "params": params,
+                               "error": traceback.format_exc()})
+        raise SystemExit(HANDLED_FAILURE)
+
+    _append(results_path, {
+        "run_id": run_id,
+        "event": "done",
+        "params": params,
+        "episodes": len(rewards),
+        "final_avg_reward": float(np.mean(rewards[-20:])) if rewards else None,
+        "seconds": time.time() - start,
+    })
+
+
+def run_sweep(configs: list[dict], results_path: str = "outputs/sweep.jsonl",
+              workers: int = None, save_dir: str = "checkpoints/sweep",
+              retries: int = 0) -> list[dict]:
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(os.path.dirname(results_path) or ".", exist_ok=True)
+    os.makedirs(save_dir, exist_ok=True)
+
+    ctx = mp.get_context("spawn")
+    pending = [(f"run{i:04d}", _train_params(cfg), 0) for i, cfg in enumerate(configs)]
+    pending.reverse()
+    running = {}
+    summary = {}
+
+    while pending or running:
+        while pending and len(running) < workers:
+            run_id, params, attempt = pending.pop()
+            proc = ctx.Process(target=_run_one, args=(run_id, params, results_path, save_dir),
+                               name=f"sweep-{run_id}")
+            proc.start()
+            running[proc.sentinel] = (proc, run_id, params, attempt)
+
+        for sentinel in wait(list(running)):
+            proc, run_id, params, attempt = running.pop(sentinel)
+            proc.join()
+            if proc.exitcode == 0:
+                status = "done"
+            elif proc.exitcode == HANDLED_FAILURE:
+                status = "error"
+            else:
+                status = "crashed"
+                _append(results_path, {"run_id": run_id, "event": "crashed",
+                                       "params": params, "exitcode": proc.exitcode})
+            if status != "done" and attempt < retries:
+                pending.append((run_id, params, attempt + 1))
+                continue
+            summary[run_id] = {"run_id": run_id, "params": params, "status": status}
+
+    return [summary[k] for k in sorted(summary)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter / seed sweep over train_dqn")
+    parser.add_argument("--config", type=str, default="config.yaml", help="YAML file with base config and sweep section")
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent runs (default: CPU count)")
+    parser.add_argument("--results", type=str, default="outputs/sweep.jsonl", help="JSON-lines results file")
+    parser.add_argument("--save_dir", type=str, default="checkpoints/sweep", help="Directory for per-run checkpoints")
+    parser.add_argument("--retries", type=int, default=0, help="Times to re-run a failed configuration")
+    args = parser.parse_args()
+
+    configs = load_sweep(args.config)
+    print(f"Running {len(configs)} configurations on {args.workers or os.cpu_count()} workers...")
+    for run in run_sweep(configs, args.results, args.workers, args.save_dir, args.retries):
+        print(f"{run['run_id']}: {run['status']} {run['params']}")
@@ -0,0 +1,213 @@
+"""
+telemetry.py
+
+Per-episode training telemetry for train_dqn. Attaching a TrainingTelemetry
+wraps the env's step, the agent's select_action / update and the replay
+buffer's sample on those instances only, so training without telemetry runs
+the plain code path.
+
+Each episode produces one record:
+    Episode, Reward, Loss (mean over updates), MaxQ (mean batch max-Q),
+    Epsilon, Steps, Updates, EnvTime, ActTime, SampleTime, BackpropTime,
+    EpisodeTime (seconds)
+
+Records go to any number of sinks: CSVSink / JSONLSink (buffered writers; the
+CSV is readable by visualize_training.py) and MemorySink. The file sinks
+append to an existing log, so a resumed run continues it; pass append=False
+to start a new one. With profile_episodes=N the first N episodes this process
+runs (counted from the resume point) also run under cProfile (stats in
+<profile_path>.prof) or the torch profiler (Chrome trace in
+<profile_path>.json).
+
+    telemetry = TrainingTelemetry([CSVSink("outputs/training_log.csv")])
+    train_dqn(episodes=200, telemetry=telemetry)
+"""
+
+import csv
+import json
+import os
+import time
+
+FIELDS = (
+    "Episode", "Reward", "Loss", "MaxQ", "Epsilon", "Steps", "Updates",
+    "EnvTime", "ActTime", "SampleTime", "BackpropTime", "EpisodeTime",
+)
+
+
+class MemorySink:
+    def __init__(self):
+        self.records = []
+
+    def write(self, record: dict) -> None:
+        self.records.append(record)
+
+    def close(self) -> None:
+        pass
+
+    def to_frame(self):
+        import pandas as pd
+
+        return pd.DataFrame(self.records, columns=FIELDS)
+
+
+class _BufferedSink:
+    def __init__(self, path: str, flush_every: int = 50, append: bool = True):
+        self.path = path
+        self.flush_every = flush_every
+        self._buffer = []
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        open(path, "a" if append else "w").close()
+
+    def write(self, record: dict) -> None:
+        self._buffer.append(record)
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            with open(self.path, "a", newline="") as f:
+                self._write_rows(f, self._buffer)
+            self._buffer = []
+
+    def close(self) -> None:
+        self.flush()
+
+
+class CSVSink(_BufferedSink):
+    def _write_rows(self, f, records) -> None:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        # opened for append, so only an empty file gets the header
+        if f.tell() == 0:
+            writer.writeheader()
+        writer.writerows(records)
+
+
+class JSONLSink(_BufferedSink):
+    def _write_rows(self, f, records) -> None:
+        f.writelines(json.dumps(r) + "\n" for r in records)
+
+
+class TrainingTelemetry:
+    def __init__(self, sinks=(), profile_episodes: int = 0, profiler: str = "cprofile",
+                 profile_path: str = "outputs/train_profile"):
+        if profiler not in ("cprofile", "torch"):
+            raise ValueError(f"Unknown profiler: {profiler}")
+        self.sinks = list(sinks)
+        self.profile_episodes = profile_episodes
+        self.profiler = profiler
+        self.profile_path = profile_path
+        self._profile = None
+        self._first_ep = None
+        self.agent = None
+        self.times = dict.fromkeys(("EnvTime", "ActTime", "SampleTime", "BackpropTime"), 0.0)
+        self._reset_counters()
+
+    def _reset_counters(self) -> None:
+        # in place: the wrappers installed by attach() hold this dict
+        for key in self.times:
+            self.times[key] = 0.0
+        self.steps = 0
+        self.losses = []
+        self.max_qs = []
+        self._episode_start = time.perf_counter()
+
+    def _timed(self, fn, key):
+        times = self.times
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                times[key] += time.perf_counter() - start
+
+        return wrapper
+
+    def attach(self, agent, env) -> None:
+        self.agent = agent
+        agent.track_q = True
+        step = env.step
+
+        def env_step(action):
+            self.steps += 1
+            return step(action)
+
+        env.step = self._timed(env_step, "EnvTime")
+        agent.select_action = self._timed(agent.select_action, "ActTime")
+        agent.memory.sample = self._timed(agent.memory.sample, "SampleTime")
+        update = agent.update
+
+        def timed_update(*args, **kwargs):
+            sampled = self.times["SampleTime"]
+            start = time.perf_counter()
+            loss = update(*args, **kwargs)
+            # backprop = the whole update minus the time spent sampling
+            self.times["BackpropTime"] += (time.perf_counter() - start
+                                           - (self.times["SampleTime"] - sampled))
+            if loss is not None:
+                self.losses.append(loss)
+                self.max_qs.append(agent.last_max_q)
+            return loss
+
+        agent.update = timed_update
+
+    def start_episode(self, ep: int) -> None:
+        if self._first_ep is None:
+            self._first_ep = ep
+            if self.profile_episodes > 0:
+                self._start_profile()
+        self._reset_counters()
+
+    def end_episode(self, ep: int, reward: float) -> dict:
+        # tensors are only converted here so update() never syncs per step
+        losses = [float(l) for l in self.losses]
+        max_qs = [float(q) for q in self.max_qs]
+        record = {
+            "Episode": ep + 1,
+            "Reward": float(reward),
+            "Loss": sum(losses) / len(losses) if losses else None,
+            "MaxQ": sum(max_qs) / len(max_qs) if max_qs else None,
+            "Epsilon": float(self.agent.epsilon_threshold()) if self.agent is not None else None,
+            "Steps": self.steps,
+            "Updates": len(losses),
+            **self.times,
+            "EpisodeTime": time.perf_counter() - self._episode_start,
+        }
+        for sink in self.sinks:
+            sink.write(record)
+        if self._profile is not None and ep + 1 - self._first_ep >= self.profile_episodes:
+            self._stop_profile()
+        return record
+
+    def _start_profile(self) -> None:
+        os.makedirs(os.path.dirname(self.profile_path) or ".", exist_ok=True)
+        if self.profiler == "torch":
+            import torch
+
+            self._profile = torch.profiler.profile(
+                activities=[torch.profiler.ProfilerActivity.CPU])
+            self._profile.__enter__()
+        else:
+            import cProfile
+
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def _stop_profile(self) -> None:
+        if self.profiler == "torch":
+            self._profile.__exit__(None, None, None)
+            self._profile.export_chrome_trace(self.profile_path + ".json")
+            print(self._profile.key_averages().table(sort_by="cpu_time_total", row_limit=15))
+        else:
+            import pstats
+
+            self._profile.disable()
+            self._profile.dump_stats(self.profile_path + ".prof")
+            pstats.Stats(self._profile).sort_stats("cumulative").print_stats(15)
+        self._profile = None
+
+    def close(self) -> None:
+        if self._profile is not None:
+            self._stop_profile()
+        for sink in self.sinks:
+            sink.close()
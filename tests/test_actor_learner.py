@@ -0,0 +1,59 @@
+"""Seqlock weight refresh of actor_learner actors."""
+
+import torch
+
+from actor_learner import _refresh_weights
+from dqn_agent import QNetwork
+
+
+class Version:
+    def __init__(self, value):
+        self.value = value
+
+
+class PublishingNetwork(QNetwork):
+    # state_dict() simulates the learner starting a publish mid-copy: the
+    # version turns odd and half of the tensors are already overwritten
+    def __init__(self, version):
+        super().__init__(3, 9, 16)
+        self.version = version
+
+    def state_dict(self, *args, **kwargs):
+        state = super().state_dict(*args, **kwargs)
+        self.version.value += 1
+        with torch.no_grad():
+            for t in list(state.values())[: len(state) // 2]:
+                t.fill_(123.0)
+        return state
+
+
+def weights(net):
+    return {k: t.clone() for k, t in net.state_dict().items()}
+
+
+def test_refresh_loads_consistent_weights():
+    torch.manual_seed(0)
+    q_net, shared = QNetwork(3, 9, 16), QNetwork(3, 9, 16)
+    assert _refresh_weights(q_net, shared, Version(2), seen_version=0) == 2
+    for k, t in shared.state_dict().items():
+        assert torch.equal(q_net.state_dict()[k], t)
+
+
+def test_refresh_skips_odd_and_seen_versions():
+    torch.manual_seed(0)
+    q_net, shared = QNetwork(3, 9, 16), QNetwork(3, 9, 16)
+    before = weights(q_net)
+    assert _refresh_weights(q_net, shared, Version(3), seen_version=0) == 0
+    assert _refresh_weights(q_net, shared, Version(0), seen_version=0) == 0
+    for k, t in before.items():
+        assert torch.equal(q_net.state_dict()[k], t)
+
+
+def test_torn_read_keeps_previous_weights():
+    torch.manual_seed(0)
+    version = Version(4)
+    q_net, shared = QNetwork(3, 9, 16), PublishingNetwork(version)
+    before = weights(q_net)
+    assert _refresh_weights(q_net, shared, version, seen_version=2) == 2
+    for k, t in before.items():
+        assert torch.equal(q_net.state_dict()[k], t)
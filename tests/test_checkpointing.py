@@ -0,0 +1,35 @@
+"""Resuming train_dqn from a full-state checkpoint is bit-exact."""
+
+import os
+
+import torch
+
+from checkpointing import latest_checkpoint
+from train import train_dqn
+
+KWARGS = dict(episodes=6, horizon=6, batch_size=8, seed=1, prioritized=True)
+
+
+def weights(path):
+    state = torch.load(path)
+    return state.get("q_net", state)
+
+
+def test_resume_matches_uninterrupted_run(tmp_path):
+    full = os.path.join(tmp_path, "full", "dqn.pth")
+    full_rewards = train_dqn(**KWARGS, save_path=full)
+
+    # stop after 3 episodes, then resume the remaining 3 from the checkpoint
+    part = os.path.join(tmp_path, "part", "dqn.pth")
+    state_dir = os.path.join(tmp_path, "part", "state")
+    train_dqn(**{**KWARGS, "episodes": 3}, save_path=part,
+              checkpoint_dir=state_dir, checkpoint_every=3)
+    resume_from = latest_checkpoint(state_dir)
+    assert resume_from is not None and resume_from.endswith("ep000002")
+    resumed_rewards = train_dqn(**KWARGS, save_path=part, resume_from=resume_from)
+
+    assert resumed_rewards == full_rewards
+    expected, actual = weights(full), weights(part)
+    assert expected.keys() == actual.keys()
+    for name in expected:
+        assert torch.equal(expected[name], actual[name]), name
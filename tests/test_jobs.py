@@ -0,0 +1,45 @@
+"""JobQueue recovery from a dead worker process."""
+
+import json
+import os
+import time
+
+from jobs import ACTIVE, JobQueue
+
+
+def wait_for(predicate, timeout=60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def test_dead_worker_fails_jobs_and_rebuilds_pool(tmp_path):
+    queue = JobQueue(max_workers=1, checkpoint_dir=str(tmp_path))
+    try:
+        params = {"episodes": 100000, "horizon": 12, "seed": 0}
+        job_id = queue.submit("train", params)
+        assert wait_for(lambda: queue.status(job_id)["status"] == "running")
+        broken = queue._executor
+        for proc in list(broken._processes.values()):
+            proc.kill()
+
+        assert wait_for(lambda: queue.status(job_id)["status"] not in ACTIVE)
+        job = queue.status(job_id)
+        assert job["status"] == "failed"
+        assert "BrokenProcessPool" in job["error"]
+        assert queue._executor is not broken
+
+        # the record survives a restart and the same parameters can be resubmitted
+        with open(os.path.join(tmp_path, f"{job_id}.json")) as f:
+            assert json.load(f)["status"] == "failed"
+        retry_id = queue.submit("train", params)
+        assert retry_id != job_id
+        assert queue.cancel(retry_id)
+        assert wait_for(lambda: queue.status(retry_id)["status"] not in ACTIVE)
+        assert queue.status(retry_id)["status"] == "cancelled"
+        assert os.path.exists(os.path.join(tmp_path, f"{retry_id}.json"))
+    finally:
+        queue.shutdown()
@@ -0,0 +1,75 @@
+"""Parity of the exported policy artifacts with the eager QNetwork."""
+
+import numpy as np
+import pytest
+import torch
+
+from dqn_agent import QNetwork
+from lookup_policy import LookupTablePolicy
+from numpy_policy import NumpyPolicy
+from policy_export import (export_lookup_table, export_numpy, export_torchscript, parity_states,
+                           reachable_bounds, rollout_states)
+
+
+@pytest.fixture
+def q_net():
+    torch.manual_seed(0)
+    return QNetwork(3, 9, 64).eval()
+
+
+@pytest.fixture
+def states():
+    # fixed inputs: random states plus the corners of the normalized range
+    corners = np.array([[0, 0, 0], [1, 1, 1], [0.5, 0.3, 0.0], [1, 0.2, 0.9]], dtype=np.float32)
+    return np.concatenate([parity_states(512, seed=123), corners])
+
+
+def eager_q_values(q_net, states):
+    with torch.no_grad():
+        return q_net(torch.from_numpy(states)).numpy()
+
+
+def torchscript_q_values(path, states):
+    scripted = torch.jit.load(path)
+    with torch.no_grad():
+        return scripted(torch.from_numpy(states)).numpy()
+
+
+def test_torchscript_matches_eager(q_net, states, tmp_path):
+    path = str(tmp_path / "policy.ts")
+    export_torchscript(q_net, path, quantize=False)
+    np.testing.assert_allclose(torchscript_q_values(path, states), eager_q_values(q_net, states),
+                               rtol=0, atol=1e-5)
+
+
+def test_int8_torchscript_matches_eager(q_net, states, tmp_path):
+    path = str(tmp_path / "policy.int8.ts")
+    export_torchscript(q_net, path, quantize=True)
+    expected = eager_q_values(q_net, states)
+    actual = torchscript_q_values(path, states)
+    # int8 weights: Q-values within 0.02, greedy actions almost always equal
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=0.02)
+    assert (actual.argmax(1) == expected.argmax(1)).mean() >= 0.95
+
+
+def test_numpy_matches_eager(q_net, states, tmp_path):
+    path = str(tmp_path / "policy.npz")
+    export_numpy(q_net, path)
+    policy = NumpyPolicy.load(path)
+    expected = eager_q_values(q_net, states)
+    np.testing.assert_allclose(policy.q_values(states), expected, rtol=0, atol=1e-5)
+    np.testing.assert_array_equal(policy(states), expected.argmax(1))
+
+
+def test_lookup_table_spans_reachable_states(q_net, tmp_path):
+    path = str(tmp_path / "policy.lut.npz")
+    report = export_lookup_table(q_net, path)
+    policy = LookupTablePolicy.load(path)
+    lows, highs = reachable_bounds()
+    np.testing.assert_allclose(policy.lows, lows, rtol=1e-6)
+    np.testing.assert_allclose(policy.highs, highs, rtol=1e-6)
+    # the expense ratio never drops below expense_min / expense_max
+    assert policy.lows[1] > 0.8
+    states = rollout_states(n_configs=32)
+    assert (states >= policy.lows).all() and (states <= policy.highs).all()
+    assert report["uniform_agreement"] == 1.0 - policy.disagreement["uniform"]
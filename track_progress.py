@@ -4,23 +4,208 @@ import os
 import datetime
 
 def load_plan(filepath):
+    if os.path.isdir(filepath):
+        # a plan_store.PlanStore directory, read without parsing
+        from plan_store import PlanStore
+        return PlanStore(filepath).to_frame()
     if filepath.endswith(".csv"):
         return pd.read_csv(filepath)
     elif filepath.endswith(".xlsx"):
         return pd.read_excel(filepath)
+    elif filepath.endswith(".parquet"):
+        return pd.read_parquet(filepath)
     else:
-        raise ValueError("Unsupported file format. Please use CSV or XLSX.")
+        raise ValueError("Unsupported file format. Please use CSV, XLSX or Parquet.")
+
+def load_actuals(filepath):
+    if filepath.endswith(".csv"):
+        return pd.read_csv(filepath)
+    elif filepath.endswith(".parquet"):
+        return pd.read_parquet(filepath)
+    else:
+        raise ValueError("Unsupported file format. Please use CSV or Parquet.")
+
+def deviation_pct(actual, planned):
+    # (actual - planned) / planned in %; 0 when both are 0, NaN when only
+    # the plan is 0
+    actual = np.asarray(actual, dtype=np.float64)
+    planned = np.asarray(planned, dtype=np.float64)
+    out = np.divide(actual - planned, planned, out=np.full(planned.shape, np.nan), where=planned != 0)
+    out[(planned == 0) & (actual == 0)] = 0.0
+    return out * 100
+
+def reconcile_actuals(plan_df, actuals_df, overspend_threshold=10.0):
+    # Joins plan rows with ActualSpend/ActualSave/ActualInvest on
+    # (user, Month, Period); "user" is only used when both frames have it, and
+    # a plan without it is applied to every user in the actuals. Returns the
+    # per-period deviation table and a per-user summary. Actuals without
+    # "user" cannot be matched to a plan of several users.
+    if ("user" in plan_df.columns and "user" not in actuals_df.columns
+            and plan_df["user"].nunique() > 1):
+        raise ValueError("The plan covers several users but the actuals have no 'user' column")
+    keys = [k for k in ("user", "Month", "Period") if k in plan_df.columns and k in actuals_df.columns]
+    planned = plan_df[keys + ["SpendAmt", "SaveAmt", "InvestAmt"]]
+    merged = actuals_df.merge(planned, on=keys, how="inner")
+
+    group = [k for k in ("user",) if k in merged.columns]
+    results = merged[group + ["Month", "Period"]].copy()
+    for name, plan_col in (("Spend", "SpendAmt"), ("Save", "SaveAmt"), ("Invest", "InvestAmt")):
+        results[f"Planned{name}"] = merged[plan_col].to_numpy()
+        results[f"Actual{name}"] = merged[f"Actual{name}"].to_numpy()
+        results[f"{name}Deviation(%)"] = deviation_pct(merged[f"Actual{name}"], merged[plan_col])
+    results["Overspend"] = results["SpendDeviation(%)"].to_numpy() > overspend_threshold
+
+    dev_cols = ["SpendDeviation(%)", "SaveDeviation(%)", "InvestDeviation(%)"]
+    if group:
+        summary = results.groupby(group, sort=True)[dev_cols].mean()
+        summary["OverspendPeriods"] = results.groupby(group, sort=True)["Overspend"].sum()
+        summary = summary.reset_index()
+    else:
+        summary = results[dev_cols].mean().to_frame().T
+        summary["OverspendPeriods"] = results["Overspend"].sum()
+    summary = summary.rename(columns={c: f"Avg{c}" for c in dev_cols})
+    summary["Overspend"] = summary["AvgSpendDeviation(%)"] > overspend_threshold
+    return results, summary
 
 def restructure_plan(plan_df, overspend_ratio):
-    adjust_factor = 1 + overspend_ratio / 100
-    new_plan = plan_df.copy()
-    new_plan['SpendAmt'] = plan_df['SpendAmt'] * adjust_factor
-    total_available = plan_df['SaveAmt'] + plan_df['InvestAmt']
-    reduction = total_available * (overspend_ratio / 100)
-    new_plan['SaveAmt'] = plan_df['SaveAmt'] - reduction * 0.6
-    new_plan['InvestAmt'] = plan_df['InvestAmt'] - reduction * 0.4
+    return restructure_plans(plan_df, overspend_ratio)
+
+def _row_ratios(plans_df, ratios):
+    # Overspend ratio (%) for every plan row. `ratios` is a scalar, a Series
+    # indexed by user, or a DataFrame with an "OverspendRatio" column keyed by
+    # "user" and optionally "Month"; rows without a ratio get 0.
+    if np.isscalar(ratios):
+        return np.full(len(plans_df), float(ratios))
+    if isinstance(ratios, pd.Series):
+        ratios = ratios.rename("OverspendRatio").rename_axis("user").reset_index()
+    keys = [k for k in ("user", "Month") if k in ratios.columns]
+    merged = plans_df[keys].merge(ratios[keys + ["OverspendRatio"]], on=keys, how="left")
+    return merged["OverspendRatio"].fillna(0.0).to_numpy()
+
+def restructure_plans(plans_df, ratios, policy=None, start_wealth=None, configs=None):
+    # Restructures many users' remaining plans in one pass.
+    #
+    # Without a policy the rule of the interactive tracker is applied
+    # row-wise: spending grows by the ratio and the same share of save+invest
+    # is taken 60/40 from savings and investments.
+    #
+    # With a policy (see scheduler.py) expense needs are inflated by the ratio
+    # and the policy is rolled forward from each user's wealth (`start_wealth`,
+    # a Series indexed by user, default 0), all users stepped together.
+    # `configs` is the FinanceConfig the plans were generated with, or a dict
+    # of them by user; the states are then normalized exactly as in the
+    # original rollout. Without it the normalization is estimated from the
+    # plan rows (expense_max from the mean sampled expense need).
+    ratio = _row_ratios(plans_df, ratios)
+    if policy is not None:
+        return _replan_with_policy(plans_df, ratio, policy, start_wealth, configs)
+
+    adjust_factor = 1 + ratio / 100
+    new_plan = plans_df.copy()
+    new_plan['SpendAmt'] = plans_df['SpendAmt'] * adjust_factor
+    total_available = plans_df['SaveAmt'] + plans_df['InvestAmt']
+    reduction = total_available * (ratio / 100)
+    new_plan['SaveAmt'] = plans_df['SaveAmt'] - reduction * 0.6
+    new_plan['InvestAmt'] = plans_df['InvestAmt'] - reduction * 0.4
+    return new_plan
+
+def _replan_with_policy(plans_df, ratio, policy, start_wealth, configs=None):
+    from env_personal_finance import FinanceConfig, PersonalFinanceEnv
+
+    missing = {"Income", "ExpenseNeed"} - set(plans_df.columns)
+    if missing:
+        raise ValueError(f"Re-running the policy needs plan columns: {sorted(missing)}")
+
+    users = plans_df["user"].to_numpy() if "user" in plans_df.columns else np.zeros(len(plans_df), dtype=np.int64)
+    month = plans_df["Month"].to_numpy()
+    period = plans_df["Period"].to_numpy()
+    order = np.lexsort((period, month, users))
+
+    # rows grouped by user in time order; (u, t) is a row's slot in the grid
+    user_ids, u = np.unique(users[order], return_inverse=True)
+    starts = np.searchsorted(u, np.arange(len(user_ids)))
+    t = np.arange(len(order)) - starts[u]
+    counts = np.diff(np.append(starts, len(order)))
+    n_users, n_steps = len(user_ids), int(t.max()) + 1
+
+    income = plans_df["Income"].to_numpy(dtype=np.float64)[order]
+    base_expense = plans_df["ExpenseNeed"].to_numpy(dtype=np.float64)[order]
+    expense = base_expense * (1 + ratio[order] / 100)
+
+    # normalisation as in PersonalFinanceEnv._get_state, per user
+    if configs is not None:
+        if isinstance(configs, FinanceConfig):
+            configs = {user: configs for user in user_ids}
+        missing = [user for user in user_ids if user not in configs]
+        if missing:
+            raise ValueError(f"No FinanceConfig for user {missing[0]}")
+        monthly_income = np.array([configs[user].monthly_income for user in user_ids], dtype=np.float64)
+        expense_max = np.array([configs[user].expense_max for user in user_ids], dtype=np.float64)
+        horizon_months = np.array([configs[user].horizon_months for user in user_ids])
+    else:
+        periods_per_month = np.maximum.reduceat(period[order], starts)
+        horizon_months = np.maximum.reduceat(month[order], starts)
+        monthly_income = income[starts] * periods_per_month
+        expense_max = 1.1 * np.add.reduceat(base_expense, starts) / counts
+    wealth_scale = monthly_income * horizon_months
+
+    grid_income = np.zeros((n_users, n_steps))
+    grid_expense = np.zeros((n_users, n_steps))
+    valid = np.zeros((n_users, n_steps), dtype=bool)
+    grid_income[u, t] = income
+    grid_expense[u, t] = expense
+    valid[u, t] = True
+
+    wealth = np.zeros(n_users)
+    if start_wealth is not None:
+        wealth = pd.Series(start_wealth).reindex(user_ids).fillna(0.0).to_numpy(dtype=np.float64)
+
+    actions = PersonalFinanceEnv(FinanceConfig()).actions
+    alloc_grid = np.zeros((n_users, n_steps, 3))
+    wealth_grid = np.zeros((n_users, n_steps))
+    for step in range(n_steps):
+        idx = np.flatnonzero(valid[:, step])
+        states = np.stack([
+            grid_income[idx, step] / monthly_income[idx],
+            grid_expense[idx, step] / expense_max[idx],
+            wealth[idx] / wealth_scale[idx],
+        ], axis=1).astype(np.float32)
+        alloc = actions[policy(states)]
+        wealth[idx] += grid_income[idx, step] * (alloc[:, 1] + alloc[:, 2])
+        alloc_grid[idx, step] = alloc
+        wealth_grid[idx, step] = wealth[idx]
+
+    alloc = alloc_grid[u, t]
+    new_plan = plans_df.copy()
+    for col, values in (
+        ("ExpenseNeed", expense),
+        ("Spend%", alloc[:, 0]),
+        ("Save%", alloc[:, 1]),
+        ("Invest%", alloc[:, 2]),
+        ("SpendAmt", income * alloc[:, 0]),
+        ("SaveAmt", income * alloc[:, 1]),
+        ("InvestAmt", income * alloc[:, 2]),
+        ("Wealth", wealth_grid[u, t]),
+    ):
+        column = np.empty(len(order))
+        column[order] = values
+        new_plan[col] = column
     return new_plan
 
+def plan_configs(plan_df, avg_monthly_expense):
+    # The scheduler.schedule_config of every user's plan, for plans generated
+    # with the given average monthly expense
+    from scheduler import schedule_config
+
+    users = plan_df["user"] if "user" in plan_df.columns else pd.Series(0, index=plan_df.index)
+    grouped = plan_df.groupby(users.to_numpy())
+    periods_per_month = grouped["Period"].max()
+    monthly_income = grouped["Income"].first() * periods_per_month
+    horizon_months = grouped["Month"].max()
+    return {user: schedule_config(float(monthly_income[user]), avg_monthly_expense,
+                                  int(horizon_months[user]), int(periods_per_month[user]))
+            for user in periods_per_month.index}
+
 def save_file_safely(df, filename, folder="outputs"):
     os.makedirs(folder, exist_ok=True)
     path = os.path.join(folder, filename)
@@ -45,32 +230,25 @@ def track_progress(plan_df, months_to_track):
 
     print(f"\nTracking progress for first {months_to_track} months...\n")
 
-    results = []
     months = sorted(plan_df["Month"].unique())[:months_to_track]
+    tracked = plan_df[plan_df["Month"].isin(months)]
+
+    actuals = []
+    for idx, row in tracked.iterrows():
+        print(f"Month {int(row['Month'])}, Period {int(row['Period'])}: Planned Spend={row['SpendAmt']}, Save={row['SaveAmt']}, Invest={row['InvestAmt']}")
+        actual_spend = float(input("Enter Actual Spend: "))
+        actual_save = float(input("Enter Actual Save: "))
+        actual_invest = float(input("Enter Actual Invest: "))
+        actuals.append({
+            "Month": row["Month"],
+            "Period": row["Period"],
+            "ActualSpend": actual_spend,
+            "ActualSave": actual_save,
+            "ActualInvest": actual_invest,
+        })
 
-    for m in months:
-        month_df = plan_df[plan_df["Month"] == m]
-        for idx, row in month_df.iterrows():
-            print(f"Month {m}, Period {int(row['Period'])}: Planned Spend={row['SpendAmt']}, Save={row['SaveAmt']}, Invest={row['InvestAmt']}")
-            actual_spend = float(input("Enter Actual Spend: "))
-            actual_save = float(input("Enter Actual Save: "))
-            actual_invest = float(input("Enter Actual Invest: "))
-
-            results.append({
-                "Month": m,
-                "Period": row["Period"],
-                "PlannedSpend": row["SpendAmt"],
-                "ActualSpend": actual_spend,
-                "SpendDeviation(%)": ((actual_spend - row["SpendAmt"]) / row["SpendAmt"]) * 100,
-                "PlannedSave": row["SaveAmt"],
-                "ActualSave": actual_save,
-                "SaveDeviation(%)": ((actual_save - row["SaveAmt"]) / row["SaveAmt"]) * 100,
-                "PlannedInvest": row["InvestAmt"],
-                "ActualInvest": actual_invest,
-                "InvestDeviation(%)": ((actual_invest - row["InvestAmt"]) / row["InvestAmt"]) * 100,
-            })
-
-    results_df = pd.DataFrame(results)
+    results_df, _ = reconcile_actuals(tracked, pd.DataFrame(actuals))
+    results_df = results_df.drop(columns="Overspend")
 
     avg_spend_dev = results_df["SpendDeviation(%)"].mean()
     avg_save_dev = results_df["SaveDeviation(%)"].mean()
@@ -97,7 +275,82 @@ def track_progress(plan_df, months_to_track):
     else:
         print("\nSpending within acceptable limits. No restructuring needed.")
 
+def remaining_plans(plan_df, actuals_df):
+    # Plan rows after the last month each user has actuals for.
+    if "user" in plan_df.columns and "user" in actuals_df.columns:
+        last = actuals_df.groupby("user")["Month"].max()
+        closed = plan_df["user"].map(last).fillna(0).to_numpy()
+    else:
+        closed = actuals_df["Month"].max()
+    return plan_df[plan_df["Month"].to_numpy() > closed]
+
+def reconcile_files(plan_path, actuals_path, out_path="outputs/reconciliation.csv", overspend_threshold=10.0,
+                    restructure=False, policy_path=None, avg_monthly_expense=None):
+    plan_df = load_plan(plan_path)
+    actuals_df = load_actuals(actuals_path)
+    results_df, summary_df = reconcile_actuals(plan_df, actuals_df, overspend_threshold)
+
+    root, ext = os.path.splitext(out_path)
+    summary_path = f"{root}_summary{ext}"
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    for df, path in ((results_df, out_path), (summary_df, summary_path)):
+        if ext == ".parquet":
+            df.to_parquet(path, index=False)
+        else:
+            df.to_csv(path, index=False)
+
+    flagged = int(summary_df["Overspend"].sum())
+    print(f"Reconciled {len(results_df)} periods; {flagged} of {len(summary_df)} flagged for overspending.")
+    print(f"Saved: {out_path} and {summary_path}")
+
+    if restructure and flagged:
+        flagged_summary = summary_df[summary_df["Overspend"]]
+        remaining = remaining_plans(plan_df, actuals_df)
+        policy, start_wealth = None, None
+        if "user" in flagged_summary.columns:
+            remaining = remaining[remaining["user"].isin(flagged_summary["user"])]
+            ratios = flagged_summary.set_index("user")["AvgSpendDeviation(%)"]
+        else:
+            ratios = float(flagged_summary["AvgSpendDeviation(%)"].iloc[0])
+        if policy_path:
+            from scheduler import load_policy
+            policy = load_policy(policy_path)
+            # wealth actually reached: sum of actual save + invest so far
+            saved = results_df["ActualSave"] + results_df["ActualInvest"]
+            if "user" in results_df.columns:
+                start_wealth = saved.groupby(results_df["user"]).sum()
+            else:
+                start_wealth = pd.Series({0: saved.sum()})
+        # configs from the full plan, so the horizon is not cut to the remaining months
+        configs = plan_configs(plan_df, avg_monthly_expense) if avg_monthly_expense else None
+        new_plans = restructure_plans(remaining, ratios, policy=policy, start_wealth=start_wealth,
+                                      configs=configs)
+        plans_path = f"{root}_restructured{ext}"
+        if ext == ".parquet":
+            new_plans.to_parquet(plans_path, index=False)
+        else:
+            new_plans.to_csv(plans_path, index=False)
+        print(f"Restructured {len(new_plans)} remaining periods: {plans_path}")
+    return results_df, summary_df
+
 def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Track progress against a plan")
+    parser.add_argument("--plan", type=str, default=None, help="Plan file (CSV/XLSX/Parquet) for non-interactive mode")
+    parser.add_argument("--actuals", type=str, default=None, help="Actuals file (CSV/Parquet) with ActualSpend/ActualSave/ActualInvest")
+    parser.add_argument("--out", type=str, default="outputs/reconciliation.csv", help="Deviation table output (CSV/Parquet)")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Spend deviation (%%) that counts as overspending")
+    parser.add_argument("--restructure", action="store_true", help="Restructure remaining plans of flagged users")
+    parser.add_argument("--policy", type=str, default=None, help="Policy (.npz/.ts/.pth) to re-plan with instead of proportional scaling")
+    parser.add_argument("--avg_expense", type=float, default=None, help="Average monthly expense the plan was generated with (exact state normalization for --policy)")
+    args = parser.parse_args()
+
+    if args.plan and args.actuals:
+        reconcile_files(args.plan, args.actuals, args.out, args.threshold, args.restructure, args.policy,
+                        args.avg_expense)
+        return
+
     print("Track Progress Module")
     plan_path = input("Enter existing plan file path (CSV/XLSX): ").strip().replace('"', '').replace("'", "")
 
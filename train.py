@@ -3,19 +3,72 @@ import torch
 import numpy as np
 from env_personal_finance import PersonalFinanceEnv, FinanceConfig
 from dqn_agent import DQNAgent
+from utils import set_seed
+
+BASE_CHECKPOINT = "checkpoints/base_dqn.pth"
 
 def train_dqn(episodes=200, target_update=10, batch_size=64, horizon=120,
-              income=10000.0, periods_per_month=1, save_path="checkpoints/dqn.pth"):
+              income=10000.0, periods_per_month=1, save_path="checkpoints/dqn.pth",
+              prioritized=False, lr=1e-3, gamma=0.99, epsilon_decay=500,
+              hidden_dim=64, seed=None, on_episode=None, init_from=None,
+              epsilon_start=1.0, expense_range=None, sample_config=None,
+              telemetry=None, checkpoint_dir=None, checkpoint_every=0, resume_from=None,
+              train_freq=1, gradient_steps=1, double_dqn=False, tau=None, compile=False):
+    # on_episode(ep, total_reward) is called after every episode; returning
+    # True stops training early. init_from warm-starts from a saved q_net and
+    # sample_config(ep) draws a fresh FinanceConfig for every episode.
+    # telemetry is a telemetry.TrainingTelemetry.
+    # checkpoint_every > 0 writes full training state (see checkpointing.py)
+    # every that many episodes to checkpoint_dir (default: <save_path
+    # without extension>_state); resume_from continues from such a state.
+    # The learner runs gradient_steps updates every train_freq env steps;
+    # with tau set the target net is soft-updated after every gradient step
+    # instead of copied every target_update episodes.
 
+    if seed is not None:
+        set_seed(seed)
+    expense_min, expense_max = expense_range or (FinanceConfig.expense_min, FinanceConfig.expense_max)
     cfg = FinanceConfig(monthly_income=income, horizon_months=horizon,
-                        periods_per_month=periods_per_month)
+                        periods_per_month=periods_per_month,
+                        expense_min=expense_min, expense_max=expense_max,
+                        seed=FinanceConfig.seed if seed is None else seed)
     env = PersonalFinanceEnv(cfg)
-    agent = DQNAgent(state_dim=env.state_dim, action_dim=env.action_dim)
+    agent = DQNAgent(state_dim=env.state_dim, action_dim=env.action_dim,
+                     hidden_dim=hidden_dim, lr=lr, gamma=gamma,
+                     epsilon_start=epsilon_start, epsilon_decay=epsilon_decay,
+                     prioritized=prioritized, double_dqn=double_dqn, tau=tau,
+                     gradient_steps=gradient_steps, compile=compile, memory_seed=seed)
+    if init_from is not None:
+        agent.load(init_from)
+    if telemetry is not None:
+        telemetry.attach(agent, env)
 
     all_rewards = []
+    start_ep = 0
+    if resume_from is not None:
+        from checkpointing import load_checkpoint, restore_rng_state
+
+        state = load_checkpoint(resume_from)
+        agent.load_state_dict(state["agent"])
+        restore_rng_state(state["rng"], env, sample_config)
+        all_rewards = list(state["rewards"])
+        start_ep = state["episode"] + 1
+        print(f"Resuming from episode {start_ep}")
+
+    writer = None
+    if checkpoint_every > 0:
+        from checkpointing import CheckpointWriter, capture_rng_state
 
-    for ep in range(episodes):
-        state = env.reset(monthly_income=income)
+        writer = CheckpointWriter(checkpoint_dir or os.path.splitext(save_path)[0] + "_state")
+
+    for ep in range(start_ep, episodes):
+        if telemetry is not None:
+            telemetry.start_episode(ep)
+        if sample_config is not None:
+            env.cfg = sample_config(ep)
+            state = env.reset(monthly_income=env.cfg.monthly_income)
+        else:
+            state = env.reset(monthly_income=income)
         done = False
         total_reward = 0
 
@@ -26,24 +79,146 @@ def train_dqn(episodes=200, target_update=10, batch_size=64, horizon=120,
             state = next_state
             total_reward += reward
 
-            agent.update(batch_size)
+            if agent.steps_done % train_freq == 0:
+                agent.update(batch_size)
 
         all_rewards.append(total_reward)
+        if telemetry is not None:
+            telemetry.end_episode(ep, total_reward)
 
-        if ep % target_update == 0:
+        if tau is None and ep % target_update == 0:
             agent.update_target()
 
         if (ep + 1) % 20 == 0:
             avg = np.mean(all_rewards[-20:])
             print(f"Episode {ep+1}/{episodes}, Avg Reward (last 20): {avg:.2f}")
 
+        if writer is not None and (ep + 1) % checkpoint_every == 0:
+            writer.save(ep, {"episode": ep, "rewards": list(all_rewards),
+                             "agent": agent.state_dict(),
+                             "rng": capture_rng_state(env, sample_config)})
+
+        if on_episode is not None and on_episode(ep, total_reward):
+            break
+
+    if telemetry is not None:
+        telemetry.close()
+    if writer is not None:
+        writer.wait()
     os.makedirs(os.path.dirname(save_path), exist_ok=True)
     agent.save(save_path)
     print(f"✅ Training complete. Model saved to {save_path}")
     return all_rewards
 
 
+def base_config_sampler(income_range=(2000.0, 200000.0), expense_ratio_range=(0.2, 0.8),
+                        horizon_range=(6, 120), periods_per_month=1, seed=None):
+    # Log-uniform income, expenses at a uniform share of income (+-10% per
+    # draw, like schedule_config) and a uniform horizon in months.
+    rng = np.random.default_rng(seed)
+    log_lo, log_hi = np.log(income_range)
+
+    def sample(ep):
+        income = float(np.exp(rng.uniform(log_lo, log_hi)))
+        expense = income * rng.uniform(*expense_ratio_range)
+        return FinanceConfig(monthly_income=income, expense_min=0.9 * expense,
+                             expense_max=1.1 * expense, periods_per_month=periods_per_month,
+                             horizon_months=int(rng.integers(horizon_range[0], horizon_range[1] + 1)))
+
+    sample.rng = rng  # saved and restored by checkpointing
+    return sample
+
+
+def train_base_policy(episodes=400, save_path=BASE_CHECKPOINT, seed=None,
+                      hidden_dim=64, telemetry=None, checkpoint_dir=None, checkpoint_every=0,
+                      resume_from=None, **ranges):
+    # One policy over the whole distribution of users; fine_tune() adapts it.
+    # Checkpointing works as in train_dqn, including the sampler's RNG.
+    sampler = base_config_sampler(seed=seed, **ranges)
+    return train_dqn(episodes=episodes, save_path=save_path, seed=seed,
+                     hidden_dim=hidden_dim, sample_config=sampler, telemetry=telemetry,
+                     periods_per_month=ranges.get("periods_per_month", 1),
+                     checkpoint_dir=checkpoint_dir, checkpoint_every=checkpoint_every,
+                     resume_from=resume_from)
+
+
+def plateau_stopper(window=3, patience=3, min_delta=0.01):
+    # on_episode callback: stop once the moving average reward over `window`
+    # episodes has not improved by `min_delta` (relative) for `patience`
+    # consecutive episodes.
+    rewards = []
+    best = -np.inf
+    stale = 0
+
+    def on_episode(ep, reward):
+        nonlocal best, stale
+        rewards.append(reward)
+        if len(rewards) < window:
+            return False
+        avg = np.mean(rewards[-window:])
+        if not np.isfinite(best) or avg > best + min_delta * abs(best):
+            best, stale = avg, 0
+        else:
+            stale += 1
+        return stale >= patience
+
+    return on_episode
+
+
+def fine_tune(income, expense=None, horizon=120, base_path=BASE_CHECKPOINT,
+              save_path="checkpoints/dqn.pth", max_episodes=30, periods_per_month=1,
+              window=3, patience=3, min_delta=0.01, hidden_dim=64, seed=None,
+              on_episode=None):
+    # Warm start from the base policy with little exploration and stop on a
+    # reward plateau. max_episodes=0 just copies the base weights.
+    stop = plateau_stopper(window, patience, min_delta)
+
+    def callback(ep, reward):
+        done = stop(ep, reward)
+        return (on_episode is not None and on_episode(ep, reward)) or done
+
+    expense_range = (0.9 * expense, 1.1 * expense) if expense is not None else None
+    return train_dqn(episodes=max_episodes, target_update=2, horizon=horizon, income=income,
+                     periods_per_month=periods_per_month, save_path=save_path,
+                     lr=5e-4, hidden_dim=hidden_dim, seed=seed, on_episode=callback,
+                     init_from=base_path, epsilon_start=0.1, expense_range=expense_range)
+
+
 if __name__ == "__main__":
-    rewards = train_dqn(episodes=200, target_update=10, batch_size=64,
-                        horizon=120, income=10000.0, periods_per_month=1)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train the DQN allocation policy")
+    parser.add_argument("--base", action="store_true", help="Train the shared base policy over a distribution of users")
+    parser.add_argument("--episodes", type=int, default=None, help="Episodes (default: 200, or 400 with --base)")
+    parser.add_argument("--save_path", type=str, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--checkpoint_every", type=int, default=0, help="Write full training state every N episodes")
+    parser.add_argument("--resume_from", type=str, default=None, help="Training state directory to resume from")
+    parser.add_argument("--log", type=str, default=None, help="Per-episode telemetry log (.csv or .jsonl)")
+    parser.add_argument("--profile", type=int, default=0, help="Profile the first N episodes")
+    parser.add_argument("--profiler", choices=["cprofile", "torch"], default="cprofile")
+    args = parser.parse_args()
+
+    telemetry = None
+    if args.log or args.profile:
+        from telemetry import CSVSink, JSONLSink, TrainingTelemetry
+
+        sinks = []
+        if args.log:
+            # a resumed run continues its log, a fresh one starts it over
+            sink = JSONLSink if args.log.endswith(".jsonl") else CSVSink
+            sinks.append(sink(args.log, append=args.resume_from is not None))
+        telemetry = TrainingTelemetry(sinks, profile_episodes=args.profile, profiler=args.profiler)
+
+    if args.base:
+        rewards = train_base_policy(episodes=args.episodes or 400, seed=args.seed,
+                                    save_path=args.save_path or BASE_CHECKPOINT,
+                                    telemetry=telemetry, checkpoint_every=args.checkpoint_every,
+                                    resume_from=args.resume_from)
+    else:
+        rewards = train_dqn(episodes=args.episodes or 200, target_update=10, batch_size=64,
+                            horizon=120, income=10000.0, periods_per_month=1, seed=args.seed,
+                            save_path=args.save_path or "checkpoints/dqn.pth",
+                            telemetry=telemetry, checkpoint_every=args.checkpoint_every,
+                            resume_from=args.resume_from)
     print("Final average reward over last 10 episodes:", np.mean(rewards[-10:]))
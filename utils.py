@@ -1,5 +1,5 @@
 
-import random, os, numpy as np, torch
+import random, os, numpy as np
 
 def set_seed(seed: int = 42):
     random.seed(seed)
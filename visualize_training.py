@@ -7,12 +7,14 @@ import json
 def load_training_data(filepath):
     if filepath.endswith(".csv"):
         return pd.read_csv(filepath)
+    elif filepath.endswith(".jsonl"):
+        return pd.read_json(filepath, lines=True)
     elif filepath.endswith(".json"):
         with open(filepath, "r") as f:
             data = json.load(f)
         return pd.DataFrame(data)
     else:
-        raise ValueError("Unsupported file type. Use CSV or JSON.")
+        raise ValueError("Unsupported file type. Use CSV, JSON or JSONL.")
 
 def smooth_curve(values, window=10):
     if len(values) < window:
@@ -60,7 +62,7 @@ def visualize_training_logs():
 
     planner_type = "Goal Planner" if choice == "1" else "Schedule Planner"
 
-    file_path = input(f"Enter {planner_type} training log path (CSV/JSON): ").strip().replace('"', '').replace("'", "")
+    file_path = input(f"Enter {planner_type} training log path (CSV/JSON/JSONL): ").strip().replace('"', '').replace("'", "")
     if not os.path.exists(file_path):
         print("File not found. Check your path and try again.")
         return